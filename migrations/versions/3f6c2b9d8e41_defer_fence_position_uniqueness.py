@@ -0,0 +1,42 @@
+"""Defer fence position uniqueness on PostgreSQL
+
+Revision ID: 3f6c2b9d8e41
+Revises: da30f4e738a6
+Create Date: 2026-10-16 09:12:40.318204
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3f6c2b9d8e41"
+down_revision = "da30f4e738a6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite cannot defer UNIQUE constraints; it keeps idx_prompt_position.
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.drop_index("idx_prompt_position", table_name="fence")
+    op.create_unique_constraint(
+        "uq_fence_prompt_position",
+        "fence",
+        ["prompt_id", "position"],
+        deferrable=True,
+        initially="DEFERRED",
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.drop_constraint("uq_fence_prompt_position", "fence", type_="unique")
+    op.create_index(
+        "idx_prompt_position", "fence", ["prompt_id", "position"], unique=True
+    )
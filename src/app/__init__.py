@@ -13,7 +13,7 @@ from typing import Any
 
 from asgiref.wsgi import WsgiToAsgi
 from dotenv import load_dotenv
-from flask import Flask, jsonify, session
+from flask import Flask, jsonify, request, session
 from flask_migrate import Migrate
 from flask_session import Session
 
@@ -30,6 +30,10 @@ logger = logging.getLogger(__name__)
 
 HTTP_UNAUTHORIZED = 401
 
+# Endpoints that only read the session; skipping the write-back avoids
+# re-signing and re-serializing it on every poll.
+READ_ONLY_SESSION_ENDPOINTS = frozenset({"admin.get_simple_github_token"})
+
 
 @dataclass
 class ServiceContainer:
@@ -199,7 +203,8 @@ def _configure_request_handlers(app):
 
     @app.before_request
     def before_request():
-        if check_session_expiry():
+        read_only = request.endpoint in READ_ONLY_SESSION_ENDPOINTS
+        if check_session_expiry(refresh=not read_only):
             return jsonify({"error": "Session expired"}), HTTP_UNAUTHORIZED
         if not session.get("initialized"):
             from src.app.services.global_token_counter import GlobalTokenCounter
@@ -221,7 +226,8 @@ def _configure_request_handlers(app):
                     cleanup_session()
             except Exception:
                 app.logger.exception("Error checking response JSON")
-        session.modified = True
+        if request.endpoint not in READ_ONLY_SESSION_ENDPOINTS:
+            session.modified = True
         return response
 
 
@@ -310,6 +316,10 @@ def create_app():
     """Create Flask application."""
     app = MyFlask(__name__)
 
+    # Serialize JSON responses without sorting keys or pretty-printing in debug
+    app.json.sort_keys = False
+    app.json.compact = True
+
     configure_logging()
     configure_sessions(app)
     configure_database(app)
@@ -48,9 +48,13 @@ def cleanup_session():
             session.clear()
 
 
-def check_session_expiry():
+def check_session_expiry(*, refresh: bool = True):
     """Check if the session has expired and needs cleanup.
 
+    Args:
+        refresh: Whether to bump the last activity timestamp. Read-only
+            endpoints pass False so the session is not written back.
+
     Returns:
         bool: True if session was expired and cleaned up, False otherwise
     """
@@ -73,8 +77,9 @@ def check_session_expiry():
             logger.info("Session expired, cleaning up")
             cleanup_session()
         else:
-            session["last_activity"] = datetime.now(tz=timezone.utc).isoformat()
-            session.modified = True
+            if refresh:
+                session["last_activity"] = datetime.now(tz=timezone.utc).isoformat()
+                session.modified = True
             return False
     except (ValueError, TypeError):
         logger.exception("Error parsing last activity timestamp")
@@ -2,8 +2,10 @@
 
 from __future__ import annotations
 
+import base64
+import json
 from datetime import datetime
-from typing import ClassVar
+from typing import Any, ClassVar
 
 from sqlalchemy import JSON
 from sqlalchemy.orm import relationship
@@ -36,6 +38,55 @@ class APIEndpoint(db.Model):
         "APIToken", back_populates="endpoint", cascade="all, delete-orphan"
     )
 
+    @property
+    def parsed_headers(self) -> dict[str, Any]:
+        """Configured headers as a dict, decoded once per stored value.
+
+        Headers may be stored as a dict or as a JSON string; anything that
+        does not decode to an object yields no headers. Callers must copy
+        the result before adding to it.
+        """
+        raw = self.headers
+        cached = self.__dict__.get("_parsed_headers")
+        if cached is not None and cached[0] is raw:
+            return cached[1]
+
+        if isinstance(raw, dict):
+            parsed = raw
+        elif isinstance(raw, str):
+            try:
+                parsed = json.loads(raw)
+            except json.JSONDecodeError:
+                parsed = {}
+        else:
+            parsed = {}
+        if not isinstance(parsed, dict):
+            parsed = {}
+        self._parsed_headers = (raw, parsed)
+        return parsed
+
+    @property
+    def authorization_header(self) -> str | None:
+        """Authorization header value for the configured auth, if any.
+
+        Computed once per (auth_type, auth_token) pair and memoized on the
+        instance.
+        """
+        key = (self.auth_type, self.auth_token)
+        cached = self.__dict__.get("_authorization_header")
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        auth_type, auth_token = key
+        if auth_type == "token":
+            header = f"Bearer {auth_token}"
+        elif auth_type == "basic":
+            header = "Basic " + base64.b64encode(f":{auth_token}".encode()).decode()
+        else:
+            header = None
+        self._authorization_header = (key, header)
+        return header
+
     def __repr__(self):
         """String representation of the API endpoint."""
         return f"<APIEndpoint name='{self.name}' type='{self.type}'>"
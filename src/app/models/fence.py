@@ -7,6 +7,11 @@ from sqlalchemy.exc import SQLAlchemyError
 from .db import db
 
 
+def _not_postgresql(_ddl, _target, _bind, **kw) -> bool:
+    """DDL predicate selecting every dialect except PostgreSQL."""
+    return kw["dialect"].name != "postgresql"
+
+
 class Fence(db.Model):
     """Database model for storing prompt fence blocks.
 
@@ -16,7 +21,19 @@ class Fence(db.Model):
 
     __tablename__ = "fence"
     __table_args__ = (
-        db.Index("idx_prompt_position", "prompt_id", "position", unique=True),
+        # SQLite cannot defer UNIQUE checks, so it keeps the plain unique index;
+        # PostgreSQL validates the constraint at commit, letting position shifts
+        # and inserts share one transaction without transient collisions.
+        db.Index("idx_prompt_position", "prompt_id", "position", unique=True).ddl_if(
+            callable_=_not_postgresql
+        ),
+        db.UniqueConstraint(
+            "prompt_id",
+            "position",
+            name="uq_fence_prompt_position",
+            deferrable=True,
+            initially="DEFERRED",
+        ).ddl_if(dialect="postgresql"),
         {"extend_existing": True},
     )
 
@@ -3,6 +3,7 @@ from __future__ import annotations
 import hmac
 import re
 import secrets
+from datetime import datetime
 from enum import Enum
 from pathlib import Path
 from typing import ClassVar
@@ -43,7 +44,8 @@ class PersistentVariable(db.Model):
     value = Column(Text, nullable=False)
     description = Column(Text)
     created_at = Column(DateTime, server_default=func.now())
-    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    # Set in Python on update: sub-second precision keeps table ETags fresh
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=datetime.utcnow)
 
     def __repr__(self) -> str:
         """String representation of the variable."""
@@ -85,7 +87,8 @@ class AllowedDirectory(db.Model):
     description = Column(Text)
     is_recursive = Column(Boolean, nullable=False, default=False)
     created_at = Column(DateTime, server_default=func.now())
-    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    # Set in Python on update: sub-second precision keeps table ETags fresh
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=datetime.utcnow)
 
     @classmethod
     def ensure_default_directory(cls):
@@ -122,7 +125,7 @@ class AllowedDirectory(db.Model):
             target = Path(target_path).resolve()
             if not target.exists():
                 return False, f"Path does not exist: {target_path}"
-            allowed_dirs = cls.query.all()
+            allowed_dirs = cls.query.with_entities(cls.path, cls.is_recursive).all()
             if not allowed_dirs:
                 return False, "No allowed directories configured"
             for allowed_dir in allowed_dirs:
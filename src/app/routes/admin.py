@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import asyncio
 import json
 import re
 from pathlib import Path
@@ -32,6 +31,7 @@ from src.app.models.reference_models import (
     PersistentVariable,
 )
 from src.app.services.github_api_handler import GitHubAPIHandler
+from src.app.utils.event_loop import run_coroutine
 
 MIN_API_KEY_LENGTH = 16
 
@@ -928,14 +928,10 @@ def save_simple_github_token() -> tuple[dict[str, Any], int]:
 
         # Validate token
         handler = GitHubAPIHandler(endpoint)
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
         try:
-            is_valid, error_msg = loop.run_until_complete(handler.validate_token(token))
+            is_valid, error_msg = run_coroutine(handler.validate_token(token))
         except (ClientError, RequestException) as e:
             return jsonify({"error": f"Error validating token: {e!s}"}), 500
-        finally:
-            loop.close()
 
         if not is_valid:
             return jsonify({"error": f"Invalid token: {error_msg}"}), 400
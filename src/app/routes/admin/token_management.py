@@ -5,6 +5,7 @@ from __future__ import annotations
 from datetime import datetime, timezone
 
 from flask import Blueprint, jsonify, request
+from sqlalchemy import select
 from sqlalchemy.exc import NotFound, SQLAlchemyError
 
 from src.app.models.api_token import APIToken
@@ -18,19 +19,29 @@ token_management_bp = Blueprint("token_management", __name__)
 @admin_required
 def list_tokens():
     """List all API tokens."""
-    tokens = APIToken.query.all()
+    # Project only the serialized columns; rows skip ORM hydration entirely.
+    stmt = select(
+        APIToken.id,
+        APIToken.name,
+        APIToken.service,
+        APIToken.description,
+        APIToken.created_at,
+        APIToken.last_used,
+        APIToken.is_active,
+    )
+    rows = db.session.execute(stmt).all()
     return jsonify(
         [
             {
-                "id": token.id,
-                "name": token.name,
-                "service": token.service,
-                "description": token.description,
-                "created_at": token.created_at.isoformat(),
-                "last_used": token.last_used.isoformat() if token.last_used else None,
-                "is_active": token.is_active,
+                "id": row.id,
+                "name": row.name,
+                "service": row.service,
+                "description": row.description,
+                "created_at": row.created_at.isoformat(),
+                "last_used": row.last_used.isoformat() if row.last_used else None,
+                "is_active": row.is_active,
             }
-            for token in tokens
+            for row in rows
         ]
     )
 
@@ -76,6 +87,7 @@ def update_token(token_id):
     """Update an API token."""
     token = APIToken.query.get_or_404(token_id)
     data = request.get_json()
+    now = datetime.now(timezone.utc)
 
     try:
         if "name" in data:
@@ -89,23 +101,25 @@ def update_token(token_id):
         if "is_active" in data:
             token.is_active = data["is_active"]
 
-        token.updated_at = datetime.now(timezone.utc)
+        token.updated_at = now
+
+        # Capture the response before commit so it doesn't re-SELECT the
+        # expired instance afterwards.
+        result = {
+            "id": token.id,
+            "name": token.name,
+            "service": token.service,
+            "description": token.description,
+            "updated_at": now.isoformat(),
+            "is_active": token.is_active,
+        }
         db.session.commit()
 
-        return jsonify(
-            {
-                "id": token.id,
-                "name": token.name,
-                "service": token.service,
-                "description": token.description,
-                "updated_at": token.updated_at.isoformat(),
-                "is_active": token.is_active,
-            }
-        )
-
     except (SQLAlchemyError, NotFound) as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
+    else:
+        return jsonify(result)
 
 
 @token_management_bp.route("/api/admin/tokens/<int:token_id>", methods=["DELETE"])
@@ -2,15 +2,17 @@
 
 from __future__ import annotations
 
+import json
 import logging
 from http import HTTPStatus
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from sqlalchemy import select
 from werkzeug.exceptions import BadRequest, NotFound
 
 from src.app.models.block_library import BlockLibrary
 from src.app.models.db import db
+from src.app.utils.response_utils import etag_response, table_etag
 from src.app.validators.fence_validators import (
     BlockContentValidator,
     FenceContentValidator,
@@ -20,6 +22,8 @@ logger = logging.getLogger(__name__)
 
 block_library_bp = Blueprint("block_library", __name__, url_prefix="/api/block-library")
 
+LIST_BLOCKS_BATCH_SIZE = 500
+
 block_validator = BlockContentValidator()
 fence_validator = FenceContentValidator()
 
@@ -29,6 +33,29 @@ def _raise_error(exception, message):
     raise exception(message)
 
 
+def _bad_request(message):
+    """Build a JSON 400 response for a validation failure."""
+    return jsonify({"error": message}), HTTPStatus.BAD_REQUEST
+
+
+def _validate_block_data(data):
+    """Return the validation error for a new block's data, or None if valid."""
+    if not data:
+        return "No data provided"
+
+    required_fields = ["name", "content", "format"]
+    missing_fields = [field for field in required_fields if field not in data]
+    if missing_fields:
+        return f"Missing required fields: {', '.join(missing_fields)}"
+
+    if not data["name"].strip():
+        return "Block name cannot be empty"
+
+    if not data["content"].strip():
+        return "Block content cannot be empty"
+    return None
+
+
 def _get_block_or_404(block_id):
     """Get block by ID or raise 404."""
     result = db.session.get(BlockLibrary, block_id)
@@ -52,21 +79,9 @@ def save_block():
     """
     try:
         data = request.get_json()
-        if not data:
-            _raise_error(BadRequest, "No data provided")
-
-        required_fields = ["name", "content", "format"]
-        missing_fields = [field for field in required_fields if field not in data]
-        if missing_fields:
-            _raise_error(
-                BadRequest, f"Missing required fields: {', '.join(missing_fields)}"
-            )
-
-        if not data["name"].strip():
-            _raise_error(BadRequest, "Block name cannot be empty")
-
-        if not data["content"].strip():
-            _raise_error(BadRequest, "Block content cannot be empty")
+        error = _validate_block_data(data)
+        if error:
+            return _bad_request(error)
 
         block = BlockLibrary.from_dict(data)
         db.session.add(block)
@@ -85,9 +100,39 @@ def save_block():
 def list_blocks():
     """List all blocks in the library."""
     try:
-        stmt = select(BlockLibrary).order_by(BlockLibrary.created_at.desc())
-        blocks = db.session.execute(stmt).scalars().all()
-        return jsonify([block.to_dict() for block in blocks])
+
+        def build_response():
+            stmt = (
+                select(BlockLibrary)
+                .order_by(BlockLibrary.created_at.desc())
+                .execution_options(yield_per=LIST_BLOCKS_BATCH_SIZE)
+            )
+            batches = db.session.execute(stmt).scalars().partitions()
+
+            # Serialize the first batch before the response starts, so early
+            # query or to_dict() failures still reach the handler below
+            first_batch = [json.dumps(block.to_dict()) for block in next(batches, [])]
+
+            def generate():
+                """Emit the block list as a JSON array, one batch at a time."""
+                yield "["
+                yield ",".join(first_batch)
+                try:
+                    for batch in batches:
+                        for block in batch:
+                            yield ","
+                            yield json.dumps(block.to_dict())
+                except Exception:
+                    # The 200 status is already sent; log and abort the body
+                    logger.exception("Error streaming block list")
+                    raise
+                yield "]"
+
+            return Response(
+                stream_with_context(generate()), mimetype="application/json"
+            )
+
+        return etag_response(table_etag(BlockLibrary), build_response)
 
     except Exception as e:
         logger.exception("Error listing blocks")
@@ -137,7 +182,7 @@ def export_blocks():
     try:
         data = request.get_json()
         if not data or "block_ids" not in data:
-            _raise_error(BadRequest, "No block IDs provided")
+            return _bad_request("No block IDs provided")
 
         blocks = []
         for block_id in data["block_ids"]:
@@ -174,25 +219,32 @@ def import_blocks():
     try:
         data = request.get_json()
         if not data or "blocks" not in data:
-            _raise_error(BadRequest, "No blocks provided")
+            return _bad_request("No blocks provided")
 
-        imported_blocks = []
+        # Validate every block before touching the session so a bad entry
+        # never leaves a partially populated unit of work behind.
+        required_fields = ["name", "content", "format"]
         for block_data in data["blocks"]:
-            required_fields = ["name", "content", "format"]
             missing_fields = [
                 field for field in required_fields if field not in block_data
             ]
             if missing_fields:
-                _raise_error(
-                    BadRequest, f"Missing required fields: {', '.join(missing_fields)}"
+                return _bad_request(
+                    f"Missing required fields: {', '.join(missing_fields)}"
                 )
 
-            # Create and save the block
-            block = BlockLibrary.from_dict(block_data)
-            db.session.add(block)
-            imported_blocks.append(block)
-
+        imported_blocks = [
+            BlockLibrary.from_dict(block_data) for block_data in data["blocks"]
+        ]
+        db.session.add_all(imported_blocks)
+        db.session.flush()
+        block_ids = [block.id for block in imported_blocks]
         db.session.commit()
+
+        # Reload the expired blocks with one SELECT instead of one per block.
+        db.session.scalars(
+            select(BlockLibrary).where(BlockLibrary.id.in_(block_ids))
+        ).all()
         return jsonify(
             [block.to_dict() for block in imported_blocks]
         ), HTTPStatus.CREATED
@@ -5,13 +5,14 @@ from __future__ import annotations
 from http import HTTPStatus
 from typing import Any
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from sqlalchemy import select
 from werkzeug.exceptions import BadRequest, NotFound, SQLAlchemyError
 
 from src.app.models.db import db
 from src.app.models.fence import Fence
 from src.app.models.prompt import Prompt
+from src.app.utils.response_utils import etag_response, table_etag
 from src.app.validators.base import ValidationError
 from src.app.validators.fence_validators import (
     BlockContentValidator,
@@ -34,8 +35,10 @@ def _get_prompt_or_404(prompt_id: int) -> Prompt:
 
 def _get_fence_or_404(fence_id: int, prompt_id: int) -> Fence:
     """Get fence by ID and prompt_id or raise 404."""
-    fence = db.session.get(Fence, fence_id)
-    if not fence or fence.prompt_id != prompt_id:
+    fence = db.session.scalar(
+        select(Fence).where(Fence.id == fence_id, Fence.prompt_id == prompt_id)
+    )
+    if not fence:
         msg = f"Fence {fence_id} not found in prompt {prompt_id}"
         raise NotFound(msg)
     return fence
@@ -46,6 +49,11 @@ def _raise_bad_request(message: str, original_error: Exception | None = None) ->
     raise BadRequest(message) from original_error
 
 
+def _bad_request(message: str) -> tuple[Response, int]:
+    """Build a JSON 400 response for a validation failure."""
+    return jsonify({"error": message}), HTTPStatus.BAD_REQUEST
+
+
 @fences_bp.route("/prompts/<int:prompt_id>/fences", methods=["POST"])
 def create_fence(prompt_id: int) -> tuple[dict[str, Any], int]:
     """Create a new fence in a prompt.
@@ -62,11 +70,11 @@ def create_fence(prompt_id: int) -> tuple[dict[str, Any], int]:
     data = request.get_json()
 
     if not data:
-        _raise_bad_request("No data provided")
+        return _bad_request("No data provided")
 
     required_fields = ["name", "format", "content"]
     if not all(field in data for field in required_fields):
-        _raise_bad_request(f"Missing required fields: {required_fields}")
+        return _bad_request(f"Missing required fields: {required_fields}")
 
     try:
         FenceContentValidator().validate(data.get("content"))
@@ -79,39 +87,44 @@ def create_fence(prompt_id: int) -> tuple[dict[str, Any], int]:
             VariableReferenceValidator().validate(data.get("content"))
 
     except ValidationError as e:
-        return jsonify({"error": str(e)}), HTTPStatus.BAD_REQUEST
-
-    max_position = (
-        db.session.scalar(
-            select(db.func.max(Fence.position)).where(Fence.prompt_id == prompt_id)
-        )
-        or -1
-    )
+        return _bad_request(str(e))
 
     target_position = data.get("position")
-    if target_position is not None:
-        if target_position < 0:
-            _raise_bad_request("Position cannot be negative")
-
-        target_position = min(target_position, max_position + 1)
+    if target_position is not None and target_position < 0:
+        return _bad_request("Position cannot be negative")
 
-        db.session.execute(
-            db.update(Fence)
-            .where(Fence.prompt_id == prompt_id, Fence.position >= target_position)
-            .values(position=Fence.position + 1)
-        )
-    else:
-        target_position = max_position + 1
+    next_position = (
+        select(db.func.coalesce(db.func.max(Fence.position), -1) + 1)
+        .where(Fence.prompt_id == prompt_id)
+        .scalar_subquery()
+    )
 
     try:
-        fence = Fence(
-            prompt_id=prompt_id,
-            name=data["name"],
-            format=data["format"],
-            content=data["content"],
-            position=target_position,
-        )
-        db.session.add(fence)
+        with db.session.begin_nested():
+            if target_position is None:
+                # Appending: the position is computed inside the INSERT itself.
+                target_position = next_position
+            else:
+                target_position = min(
+                    target_position, db.session.scalar(select(next_position))
+                )
+                db.session.execute(
+                    db.update(Fence)
+                    .where(
+                        Fence.prompt_id == prompt_id,
+                        Fence.position >= target_position,
+                    )
+                    .values(position=Fence.position + 1)
+                )
+
+            fence = Fence(
+                prompt_id=prompt_id,
+                name=data["name"],
+                format=data["format"],
+                content=data["content"],
+                position=target_position,
+            )
+            db.session.add(fence)
         db.session.commit()
     except (SQLAlchemyError, NotFound) as e:
         db.session.rollback()
@@ -125,24 +138,29 @@ def list_fences(prompt_id: int) -> tuple[dict[str, Any], int]:
     """List all fences for a prompt."""
     _get_prompt_or_404(prompt_id)
 
-    fences = db.session.scalars(
-        select(Fence).where(Fence.prompt_id == prompt_id).order_by(Fence.position)
-    ).all()
-
-    return jsonify(
-        {
-            "fences": [
-                {
-                    "id": fence.id,
-                    "name": fence.name,
-                    "format": fence.format,
-                    "content": fence.content,
-                    "position": fence.position,
-                }
-                for fence in fences
-            ]
-        }
-    ), HTTPStatus.OK
+    def build_response():
+        fences = db.session.scalars(
+            select(Fence).where(Fence.prompt_id == prompt_id).order_by(Fence.position)
+        ).all()
+
+        return jsonify(
+            {
+                "fences": [
+                    {
+                        "id": fence.id,
+                        "name": fence.name,
+                        "format": fence.format,
+                        "content": fence.content,
+                        "position": fence.position,
+                    }
+                    for fence in fences
+                ]
+            }
+        ), HTTPStatus.OK
+
+    return etag_response(
+        table_etag(Fence, Fence.prompt_id == prompt_id), build_response
+    )
 
 
 @fences_bp.route("/prompts/<int:prompt_id>/fences/<int:fence_id>", methods=["PUT"])
@@ -160,7 +178,7 @@ def update_fence(prompt_id: int, fence_id: int) -> tuple[dict[str, Any], int]:
     data = request.get_json()
 
     if not data:
-        _raise_bad_request("No data provided")
+        return _bad_request("No data provided")
 
     if "content" in data:
         try:
@@ -174,7 +192,7 @@ def update_fence(prompt_id: int, fence_id: int) -> tuple[dict[str, Any], int]:
                 VariableReferenceValidator().validate(data["content"])
 
         except ValidationError as e:
-            return jsonify({"error": str(e)}), HTTPStatus.BAD_REQUEST
+            return _bad_request(str(e))
 
     if "name" in data:
         fence.name = data["name"]
@@ -205,91 +223,87 @@ def delete_fence(prompt_id: int, fence_id: int) -> tuple[dict[str, Any], int]:
     return jsonify({"message": "Fence deleted successfully"}), HTTPStatus.OK
 
 
-def _validate_reorder_request(data: dict | None) -> list[dict]:
+def _validate_reorder_request(
+    data: dict | None,
+) -> tuple[list[dict] | None, str | None]:
     """Validate reorder request data.
 
     Args:
         data: Request data to validate
 
     Returns:
-        List of validated order items
-
-    Raises:
-        BadRequest: If validation fails
+        Tuple of (order items, error message); exactly one is None
     """
     if not data or "order" not in data:
-        _raise_bad_request("No order data provided")
+        return None, "No order data provided"
 
     order_data = data["order"]
     if not isinstance(order_data, list):
-        _raise_bad_request("Order must be a list")
+        return None, "Order must be a list"
 
     if not order_data:
-        _raise_bad_request("Order list cannot be empty")
+        return None, "Order list cannot be empty"
 
-    return order_data
+    return order_data, None
 
 
-def _validate_order_items(order_items: list[dict]) -> dict[int, int]:
+def _validate_order_items(
+    order_items: list[dict],
+) -> tuple[dict[int, int] | None, str | None]:
     """Validate order items and return position mapping.
 
     Args:
         order_items: List of order items to validate
-        prompt_id: ID of the prompt
 
     Returns:
-        Dictionary mapping fence IDs to positions
-
-    Raises:
-        BadRequest: If validation fails
+        Tuple of (mapping of fence IDs to positions, error message); exactly
+        one is None
     """
-    positions = {}
-    seen_positions = set()
-
-    for item in order_items:
-        if not isinstance(item, dict):
-            _raise_bad_request("Each order item must be an object")
+    # Whole-list passes; uniqueness is one set() build, not per-item lookups.
+    if not all(isinstance(item, dict) for item in order_items):
+        return None, "Each order item must be an object"
 
-        if "id" not in item or "position" not in item:
-            _raise_bad_request("Each order item must have 'id' and 'position'")
+    if not all("id" in item and "position" in item for item in order_items):
+        return None, "Each order item must have 'id' and 'position'"
 
-        fence_id = item["id"]
-        position = item["position"]
+    positions = [item["position"] for item in order_items]
+    if not all(isinstance(position, int) and position >= 0 for position in positions):
+        return None, "Position must be a non-negative integer"
 
-        if not isinstance(position, int) or position < 0:
-            _raise_bad_request("Position must be a non-negative integer")
+    if len(set(positions)) != len(positions):
+        return None, "Duplicate position found"
 
-        if position in seen_positions:
-            _raise_bad_request("Duplicate position found")
-
-        seen_positions.add(position)
-        positions[fence_id] = position
-
-    return positions
+    return {item["id"]: item["position"] for item in order_items}, None
 
 
 @fences_bp.route("/prompts/<int:prompt_id>/fences/reorder", methods=["POST"])
 def reorder_fences(prompt_id: int) -> tuple[dict[str, Any], int]:
     """Reorder fences within a prompt."""
-    try:
-        # Validate request data
-        data = request.get_json()
-        order_items = _validate_reorder_request(data)
-        positions = _validate_order_items(order_items)
+    order_items, error = _validate_reorder_request(request.get_json())
+    if error:
+        return _bad_request(error)
 
-        # Get all fences for this prompt
-        fences = db.session.scalars(
-            select(Fence).where(Fence.prompt_id == prompt_id)
-        ).all()
+    positions, error = _validate_order_items(order_items)
+    if error:
+        return _bad_request(error)
+
+    try:
+        fences = {
+            fence.id: fence
+            for fence in db.session.scalars(
+                select(Fence).where(Fence.prompt_id == prompt_id)
+            )
+        }
 
-        # Update positions
-        fence_ids = {fence.id for fence in fences}
-        for fence_id, position in positions.items():
-            if fence_id not in fence_ids:
-                _raise_bad_request(f"Fence {fence_id} not found in prompt {prompt_id}")
+        missing_ids = [fence_id for fence_id in positions if fence_id not in fences]
+        if missing_ids:
+            return _bad_request(
+                f"Fence {missing_ids[0]} not found in prompt {prompt_id}"
+            )
 
-            fence = next(f for f in fences if f.id == fence_id)
-            fence.position = position
+        with db.session.no_autoflush:
+            for fence_id, position in positions.items():
+                fences[fence_id].position = position
 
         db.session.commit()
         return jsonify({"message": "Fences reordered successfully"}), HTTPStatus.OK
@@ -2,14 +2,21 @@
 
 from __future__ import annotations
 
+import codecs
+import errno
+import io
+import json
 import logging
 import os
+import shutil
+import stat
+import time
 from datetime import datetime, timezone
+from operator import itemgetter
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, NoReturn
+from typing import IO, TYPE_CHECKING, Any, NoReturn
 
-from flask import Blueprint, current_app, jsonify, request
-from sqlalchemy import select
+from flask import Blueprint, Response, current_app, jsonify, request
 from werkzeug.exceptions import BadRequest
 from werkzeug.utils import secure_filename
 
@@ -18,9 +25,47 @@ if TYPE_CHECKING:
 
 from src.app.extensions import db
 from src.app.models.reference_models import AllowedDirectory
+from src.app.utils.allowed_dirs import (
+    find_allowed_dir_resolved,
+    get_allowed_dirs,
+    invalidate_allowed_dirs,
+    is_within,
+    normalize_path,
+)
 
 files_bp = Blueprint("files", __name__, url_prefix="/api/files")
 
+# Files larger than this are streamed instead of being read into memory
+STREAM_THRESHOLD_BYTES = 1024 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+UPLOAD_COPY_BUFFER_SIZE = 1024 * 1024
+
+# Directory names hidden from the file listing
+LIST_SKIP_PATTERNS = frozenset(
+    {
+        "__pycache__",
+        ".pytest_cache",
+        ".ruff_cache",
+        "instance",
+        "node_modules",
+    }
+)
+
+# Names excluded from the file tree, in addition to dot-prefixed entries
+TREE_SKIP_NAMES = frozenset({"__pycache__", "node_modules", ".git"})
+
+if os.name == "nt":
+
+    def _normalize_sep(path: str) -> str:
+        """Convert forward slashes in a client path to Windows separators."""
+        return path.replace("/", "\\")
+
+else:
+
+    def _normalize_sep(path: str) -> str:
+        """Return the path unchanged; forward slashes are native here."""
+        return path
+
 
 def get_workspace_path() -> Path:
     """Get the workspace path from the environment or use a default.
@@ -51,6 +96,8 @@ def raise_bad_request(
 def build_directory_tree(base_path: Path, current_path: Path) -> dict[str, Any]:
     """Build a directory tree structure.
 
+    Walks the tree with an explicit stack rather than recursion.
+
     Args:
         base_path: The base workspace path
         current_path: The current directory path
@@ -58,27 +105,35 @@ def build_directory_tree(base_path: Path, current_path: Path) -> dict[str, Any]:
     Returns:
         dict[str, Any]: Directory tree structure
     """
-    tree = {
-        "name": current_path.name or base_path.name,
-        "path": str(current_path.relative_to(base_path))
-        if current_path != base_path
-        else "",
-        "is_dir": True,
-        "expanded": str(current_path.relative_to(base_path)) == "",
-        "children": [],
-    }
 
-    try:
-        for item in current_path.iterdir():
-            if item.name.startswith("."):
-                continue
+    def make_node(path: Path) -> dict[str, Any]:
+        rel_path = str(path.relative_to(base_path)) if path != base_path else ""
+        return {
+            "name": path.name or base_path.name,
+            "path": rel_path,
+            "is_dir": True,
+            "expanded": rel_path == "",
+            "children": [],
+        }
 
-            if item.is_dir():
-                tree["children"].append(build_directory_tree(base_path, item))
-    except PermissionError:
-        logging.warning("Permission denied accessing directory")
-    except OSError:
-        logging.exception("Error accessing directory")
+    tree = make_node(current_path)
+    stack = [(tree, current_path)]
+    while stack:
+        node, path = stack.pop()
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.name.startswith(".") or not entry.is_dir():
+                        continue
+
+                    child_path = Path(entry.path)
+                    child = make_node(child_path)
+                    node["children"].append(child)
+                    stack.append((child, child_path))
+        except PermissionError:
+            logging.warning("Permission denied accessing directory")
+        except OSError:
+            logging.exception("Error accessing directory")
 
     return tree
 
@@ -105,6 +160,41 @@ def check_path_permissions(path: Path) -> tuple[bool, str | None]:
         return True, None
 
 
+def _list_entries(target_path: Path) -> list[dict[str, Any]]:
+    """Describe the entries of a directory, leaving out skipped names.
+
+    Uses one stat per entry; the file type comes from its st_mode.
+
+    Raises:
+        OSError: If the directory cannot be read
+    """
+    files = []
+    with os.scandir(target_path) as entries:
+        for entry in entries:
+            if entry.name in LIST_SKIP_PATTERNS:
+                continue
+
+            try:
+                entry_stat = entry.stat()
+                files.append(
+                    {
+                        "name": entry.name,
+                        "path": entry.path.replace("\\", "/"),
+                        "is_dir": stat.S_ISDIR(entry_stat.st_mode),
+                        "size": entry_stat.st_size
+                        if stat.S_ISREG(entry_stat.st_mode)
+                        else None,
+                        "modified": datetime.fromtimestamp(
+                            entry_stat.st_mtime, tz=timezone.utc
+                        ).isoformat(),
+                    }
+                )
+            except (PermissionError, OSError):
+                logging.warning("Error accessing")
+                continue
+    return files
+
+
 @files_bp.route("/list")
 def list_files() -> tuple[dict[str, Any], int]:
     """List files in the workspace.
@@ -130,40 +220,13 @@ def list_files() -> tuple[dict[str, Any], int]:
         if not target_path.exists():
             raise_bad_request("Path does not exist")
 
-        files = []
-
-        skip_patterns = {
-            "__pycache__",
-            ".pytest_cache",
-            ".ruff_cache",
-            "instance",
-            "node_modules",
-        }
+        # Everything inside a skipped directory is hidden, so the ancestor
+        # check is done once here and each entry only checks its own name.
+        if any(part in LIST_SKIP_PATTERNS for part in target_path.parts):
+            return jsonify({"files": [], "current_path": str(target_path)}), 200
 
         try:
-            for path in target_path.iterdir():
-                if path.name in skip_patterns or any(
-                    part in skip_patterns for part in path.parts
-                ):
-                    continue
-
-                try:
-                    stat = path.stat()
-                    files.append(
-                        {
-                            "name": path.name,
-                            "path": str(path).replace("\\", "/"),
-                            "is_dir": path.is_dir(),
-                            "size": stat.st_size if path.is_file() else None,
-                            "modified": datetime.fromtimestamp(
-                                stat.st_mtime, tz=timezone.utc
-                            ).isoformat(),
-                        }
-                    )
-                except (PermissionError, OSError):
-                    logging.warning("Error accessing")
-                    continue
-
+            files = _list_entries(target_path)
         except PermissionError as e:
             logging.exception("Permission denied accessing directory")
             raise_bad_request("Permission denied", e)
@@ -201,36 +264,65 @@ def get_file_content() -> tuple[dict[str, str], int]:
 
         workspace = get_workspace_path()
 
-        if Path(file_path).is_absolute():
-            full_path = Path(file_path).resolve()
-        else:
-            full_path = (workspace / file_path).resolve()
+        # Joining an absolute path onto the workspace yields the path itself
+        full_path = Path(os.path.normpath(workspace / file_path))
 
-        if not full_path.exists():
-            raise_bad_request(f"File does not exist: {file_path}")
+        try:
+            rel_path = str(full_path.relative_to(workspace)).replace("\\", "/")
+        except ValueError:
+            rel_path = str(full_path)
 
-        if not full_path.is_file():
-            raise_bad_request("Path is not a file")
+        # O_NOFOLLOW refuses a symlinked file atomically at open time, so the
+        # path is never resolved up front; O_NONBLOCK keeps FIFOs from hanging
+        # the open before the regular-file check below.
+        try:
+            fd = os.open(
+                full_path,
+                os.O_RDONLY
+                | getattr(os, "O_NOFOLLOW", 0)
+                | getattr(os, "O_NONBLOCK", 0),
+            )
+        except FileNotFoundError:
+            raise_bad_request(f"File does not exist: {file_path}")
+        except OSError as e:
+            if e.errno == errno.ELOOP:
+                raise_bad_request("Path is not a file", e)
+            logging.exception("Error opening file")
+            raise_bad_request("Failed to read file", e)
 
+        # The descriptor is ours to close until os.fdopen takes it over
         try:
-            content = full_path.read_text(encoding="utf-8")
-            rel_path = (
-                str(full_path.relative_to(workspace)).replace("\\", "/")
-                if str(full_path).startswith(str(workspace))
-                else str(full_path)
+            fd_stat = os.fstat(fd)
+            if not stat.S_ISREG(fd_stat.st_mode):
+                raise_bad_request("Path is not a file")
+
+            is_large = fd_stat.st_size > STREAM_THRESHOLD_BYTES
+            file = (
+                os.fdopen(fd, "rb") if is_large else os.fdopen(fd, encoding="utf-8")
             )
-            return jsonify({"content": content, "path": rel_path}), 200
-        except UnicodeDecodeError:
-            return jsonify(
-                {
-                    "content": "[Binary file content not shown]",
-                    "path": rel_path,
-                    "is_binary": True,
-                }
-            ), 200
-        except Exception:
-            logging.exception("Error reading file")
-            raise_bad_request("Failed to read file")
+        except BaseException:
+            os.close(fd)
+            raise
+
+        if is_large:
+            return _stream_file_content(file, rel_path)
+
+        with file:
+            try:
+                content = file.read()
+            except UnicodeDecodeError:
+                return jsonify(
+                    {
+                        "content": "[Binary file content not shown]",
+                        "path": rel_path,
+                        "is_binary": True,
+                    }
+                ), 200
+            except Exception:
+                logging.exception("Error reading file")
+                raise_bad_request("Failed to read file")
+
+        return jsonify({"content": content, "path": rel_path}), 200
 
     except BadRequest:
         raise
@@ -239,6 +331,113 @@ def get_file_content() -> tuple[dict[str, str], int]:
         raise_bad_request("Failed to get file content")
 
 
+def _stream_file_content(raw_file: io.BufferedReader, rel_path: str) -> Response:
+    """Stream a large file as the same JSON body get_file_content returns.
+
+    The first chunk is decoded strictly before any bytes are sent so binary
+    files still get the placeholder response. Once streaming has started the
+    status can no longer change, so later invalid bytes are replaced.
+
+    Args:
+        raw_file: The opened file in binary mode
+        rel_path: Path to report in the response
+
+    Returns:
+        Response: The JSON response, streamed in chunks
+    """
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(raw_file.read(STREAM_CHUNK_SIZE))
+    except UnicodeDecodeError:
+        raw_file.close()
+        return jsonify(
+            {
+                "content": "[Binary file content not shown]",
+                "path": rel_path,
+                "is_binary": True,
+            }
+        )
+    except Exception:
+        raw_file.close()
+        raise
+    raw_file.seek(0)
+
+    file = io.TextIOWrapper(raw_file, encoding="utf-8", errors="replace")
+
+    def generate():
+        with file:
+            yield '{"content": "'
+            while chunk := file.read(STREAM_CHUNK_SIZE):
+                # Strip the surrounding quotes to splice into the open string
+                yield json.dumps(chunk)[1:-1]
+            yield f'", "path": {json.dumps(rel_path)}}}'
+
+    response = Response(generate(), mimetype="application/json")
+    response.call_on_close(file.close)
+    return response
+
+
+def _in_memory_buffer(stream: IO[bytes]) -> io.BytesIO | None:
+    """Get the in-memory buffer behind an upload stream, if it has one.
+
+    SpooledTemporaryFile has no public way to ask whether it has rolled over
+    to disk, and calling fileno() on it forces the rollover. Its ``_file``
+    attribute holds a BytesIO until then, so that is the only place this
+    module reads it. If a Python release drops the attribute, uploads fall
+    back to the rollover and sendfile path rather than failing.
+
+    Args:
+        stream: The uploaded file stream
+
+    Returns:
+        io.BytesIO | None: The buffer holding the upload, or None if it is
+        backed by a real file
+    """
+    if isinstance(stream, io.BytesIO):
+        return stream
+    buffer = getattr(stream, "_file", None)
+    return buffer if isinstance(buffer, io.BytesIO) else None
+
+
+def _copy_upload(src: IO[bytes], dst: IO[bytes]) -> None:
+    """Copy an uploaded file stream into an open destination file.
+
+    Werkzeug spools uploads in memory until they outgrow 500 KiB, then rolls
+    them over to a temporary file. Rolled-over uploads are copied in-kernel
+    with sendfile. Uploads still held in memory, and platforms without
+    sendfile, use a buffered copy. The spool is checked before fileno() is
+    called, because fileno() itself would force a rollover to disk.
+
+    Args:
+        src: The uploaded file stream, positioned at its start
+        dst: The destination file opened for binary writing
+    """
+    if _in_memory_buffer(src) is not None:
+        shutil.copyfileobj(src, dst, UPLOAD_COPY_BUFFER_SIZE)
+        return
+
+    try:
+        src_fd = src.fileno()
+        size = os.fstat(src_fd).st_size
+        sendfile = os.sendfile
+    except (AttributeError, OSError):
+        shutil.copyfileobj(src, dst, UPLOAD_COPY_BUFFER_SIZE)
+        return
+
+    dst.flush()
+    dst_fd = dst.fileno()
+    offset = src.tell()
+    try:
+        sent = sendfile(dst_fd, src_fd, offset, size - offset)
+    except OSError:
+        # Nothing has been written yet, so a plain copy can take over
+        shutil.copyfileobj(src, dst, UPLOAD_COPY_BUFFER_SIZE)
+        return
+    offset += sent
+    while sent and offset < size:
+        sent = sendfile(dst_fd, src_fd, offset, size - offset)
+        offset += sent
+
+
 @files_bp.route("/upload", methods=["POST"])
 def upload_file() -> tuple[dict[str, str], int]:
     """Upload a file to the workspace.
@@ -256,10 +455,9 @@ def upload_file() -> tuple[dict[str, str], int]:
 
         uploads_dir = Path(current_app.config["UPLOAD_FOLDER"])
 
-        allowed_dirs = AllowedDirectory.query.all()
+        uploads_str = normalize_path(uploads_dir)
         is_allowed = any(
-            str(uploads_dir).startswith(str(Path(ad.path).resolve()))
-            for ad in allowed_dirs
+            is_within(uploads_str, entry.path) for entry in get_allowed_dirs()
         )
 
         if not is_allowed:
@@ -270,24 +468,30 @@ def upload_file() -> tuple[dict[str, str], int]:
             )
             db.session.add(allowed_dir)
             db.session.commit()
+            invalidate_allowed_dirs()
 
-        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-        filename_parts = secure_filename(file.filename).rsplit(".", 1)
-        if len(filename_parts) > 1:
-            safe_filename = f"{filename_parts[0]}_{timestamp}.{filename_parts[1]}"
-        else:
-            safe_filename = f"{filename_parts[0]}_{timestamp}"
+        timestamp = time.strftime("%Y%m%d_%H%M%S", time.gmtime())
+        name = Path(secure_filename(file.filename))
+        safe_filename = f"{name.stem}_{timestamp}{name.suffix}"
 
         target_path = uploads_dir / safe_filename
 
         try:
-            file.save(target_path)
+            fd = os.open(
+                target_path,
+                os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_NOFOLLOW", 0),
+                0o644,
+            )
+            with os.fdopen(fd, "wb") as dst:
+                _copy_upload(file.stream, dst)
+                dst.flush()
+                size = os.fstat(fd).st_size
             relative_path = f"uploads/{safe_filename}"
             return jsonify(
                 {
                     "path": relative_path,
                     "name": file.filename,
-                    "size": target_path.stat().st_size,
+                    "size": size,
                 }
             ), 201
         except OSError:
@@ -322,9 +526,8 @@ def _validate_path_format(
         Tuple of (normalized path, error response)
     """
     try:
-        if os.name == "nt":
-            path = path.replace("/", "\\")
-        full_path = Path(path).resolve()
+        path = _normalize_sep(path)
+        full_path = Path(os.path.realpath(path))
     except (ValueError, OSError, RuntimeError) as e:
         return None, (jsonify({"error": f"Invalid path format: {e!s}"}), 400)
     return full_path, None
@@ -342,26 +545,16 @@ def _check_path_exists(path: Path) -> tuple[dict[str, Any], int] | None:
 
 
 def _validate_allowed_directories(path: Path) -> tuple[dict[str, Any], int] | None:
-    """Check if path is within allowed directories.
+    """Check if an already resolved path is within allowed directories.
 
     Returns:
         Error response if validation fails, None otherwise
     """
-    allowed_dirs = db.session.scalars(select(AllowedDirectory)).all()
-    if not allowed_dirs:
+    if not get_allowed_dirs():
         return jsonify({"error": "No allowed directories configured"}), 400
 
-    for allowed_dir in allowed_dirs:
-        allowed_path = Path(allowed_dir.path).resolve()
-        try:
-            if path.is_relative_to(allowed_path):
-                if allowed_dir.is_recursive:
-                    return None
-                # Non-recursive: only allow direct children
-                if path.parent == allowed_path:
-                    return None
-        except ValueError:
-            continue
+    if find_allowed_dir_resolved(path) is not None:
+        return None
 
     return jsonify({"error": "Path is not within allowed directories"}), 403
 
@@ -410,9 +603,8 @@ def get_file_tree() -> tuple[dict[str, Any], int]:
             return jsonify({"error": "No path provided"}), 400
 
         try:
-            if os.name == "nt":
-                path = path.replace("/", "\\")
-            full_path = Path(path).resolve()
+            path = _normalize_sep(path)
+            full_path = Path(os.path.realpath(path))
         except Exception:
             current_app.logger.exception("Error resolving path")
             return jsonify({"error": "Invalid path format"}), 400
@@ -435,6 +627,9 @@ def get_file_tree() -> tuple[dict[str, Any], int]:
 def build_file_tree(path: Path) -> dict[str, Any] | str:
     """Build a tree structure for a given path.
 
+    Walks the tree with an explicit stack rather than recursion. Permission
+    problems surface from scandir itself instead of a probe per node.
+
     Args:
         path: Path to build tree for
 
@@ -442,42 +637,44 @@ def build_file_tree(path: Path) -> dict[str, Any] | str:
         dict[str, Any] | str: Tree structure or file name
     """
     try:
-        has_permission, error = check_path_permissions(path)
-        if not has_permission:
-            return f"{path.name} <{error}>"
-
-        if path.is_file():
+        if not path.is_dir():
             return path.name
 
-        if path.is_dir():
-            children = []
+        root_children: list[dict[str, Any] | str] = []
+        stack = [(path, root_children)]
+        while stack:
+            dir_path, children = stack.pop()
             try:
-                for child in path.iterdir():
-                    if child.name.startswith(".") or child.name in {
-                        "__pycache__",
-                        "node_modules",
-                        ".git",
-                    }:
-                        continue
-                    children.append(build_file_tree(child))
-
-                children.sort(
-                    key=lambda x: (
-                        isinstance(x, str),
-                        x if isinstance(x, str) else next(iter(x.keys())).lower(),
-                    )
-                )
+                # Sort keys are built while scanning: directories first by
+                # lowercased name, then files by their name as-is.
+                decorated: list[tuple[tuple[bool, str], dict[str, Any] | str]] = []
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        name = entry.name
+                        if name.startswith(".") or name in TREE_SKIP_NAMES:
+                            continue
+                        if entry.is_dir():
+                            grandchildren: list[dict[str, Any] | str] = []
+                            decorated.append(
+                                ((False, name.lower()), {name: grandchildren})
+                            )
+                            stack.append((entry.path, grandchildren))
+                        else:
+                            decorated.append(((True, name), name))
+
+                decorated.sort(key=itemgetter(0))
+                children.extend(child for _, child in decorated)
 
             except PermissionError:
-                return {path.name: ["<Permission Denied>"]}
+                children[:] = ["<Permission Denied>"]
             except OSError:
-                return {path.name: ["<Access Error>"]}
-
-            return {path.name: children}
+                children[:] = ["<Access Error>"]
 
     except Exception:
         current_app.logger.exception("Error building tree for path")
         return f"{path.name} <Error>"
+    else:
+        return {path.name: root_children}
 
 
 @files_bp.route("/stats")
@@ -489,9 +686,8 @@ def get_file_stats():
             return jsonify({"error": "No path provided"}), 400
 
         try:
-            if os.name == "nt":
-                path = path.replace("/", "\\")
-            path = Path(path).resolve()
+            path = _normalize_sep(path)
+            path = Path(os.path.realpath(path))
         except Exception:
             current_app.logger.exception("Error resolving path")
             return jsonify({"error": "Invalid path format"}), 400
@@ -2,26 +2,59 @@
 
 from __future__ import annotations
 
-import asyncio
 import logging
 import re
+from operator import itemgetter
 
 from flask import Blueprint, jsonify, request, session
 
 from src.app.models.api_endpoint import APIEndpoint
+from src.app.models.db import db
 from src.app.routes.admin import require_admin
 from src.app.services.github_api_handler import GitHubAPIHandler
 from src.app.services.token_service import TokenCountingService
+from src.app.utils.event_loop import run_coroutine
+from src.app.utils.ttl_cache import TTLCache
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-GITHUB_URL_PARTS = 2  # owner and repo
-GITHUB_URL_REGEX = r"^https?://github\.com/[\w-]+/[\w.-]+/?(?:\.git)?$"
+# Captures owner and repo; a trailing ".git" and/or slash is not part of the repo
+GITHUB_URL_PATTERN = re.compile(
+    r"^https?://github\.com/([\w-]+)/([\w.-]+?)(?:\.git)?/?$"
+)
+
+GITHUB_ENDPOINT_TTL_SECONDS = 60.0
+
+# Fields every issue needs before it can be offered in the dropdown
+_get_issue_fields = itemgetter(
+    "number", "title", "state", "created_at", "updated_at", "html_url"
+)
 
 github_reference_bp = Blueprint("github_reference", __name__)
 token_service = TokenCountingService()
 
+_endpoint_cache = TTLCache(GITHUB_ENDPOINT_TTL_SECONDS)
+_endpoint_cache.invalidate_on(APIEndpoint)
+
+
+def get_github_endpoint() -> APIEndpoint | None:
+    """Get the GitHub endpoint configuration, cached for a short TTL.
+
+    The cached instance is expunged from the session so later commits in
+    other requests cannot expire it.
+
+    Returns:
+        The GitHub APIEndpoint or None if it is not configured
+    """
+    endpoint = _endpoint_cache.get("github")
+    if endpoint is None:
+        endpoint = APIEndpoint.query.filter_by(name="github").first()
+        if endpoint is not None:
+            db.session.expunge(endpoint)
+            _endpoint_cache.set("github", endpoint)
+    return endpoint
+
 
 def validate_github_url(url: str) -> tuple[bool, str, list[str]]:
     """Validate GitHub repository URL and extract owner/repo.
@@ -35,23 +68,12 @@ def validate_github_url(url: str) -> tuple[bool, str, list[str]]:
     if not url:
         return False, "Repository URL is required", []
 
-    # Check URL format
-    if not re.match(GITHUB_URL_REGEX, url):
+    # Check URL format and extract owner and repo in one match
+    match = GITHUB_URL_PATTERN.match(url)
+    if not match:
         return False, "Invalid GitHub repository URL format", []
 
-    try:
-        # Extract owner and repo
-        parts = url.split("github.com/")[-1].rstrip(".git").rstrip("/").split("/")
-        if len(parts) != GITHUB_URL_PARTS:
-            return False, "Invalid GitHub repository URL format", []
-
-        owner, repo = parts
-        if not owner or not repo:
-            return False, "Invalid repository owner or name", []
-
-    except GitHubAPIError as e:
-        return False, e.message, []
-
+    owner, repo = match.groups()
     return True, "", [owner, repo]
 
 
@@ -76,6 +98,29 @@ def _make_response(data=None, error=None, status_code=200):
     return jsonify(data=data, status_code=status_code)
 
 
+def _format_issues(issues: list) -> list[dict]:
+    """Format GitHub issues for the dropdown, skipping incomplete entries."""
+    formatted = []
+    for issue in issues:
+        try:
+            number, title, state, created_at, updated_at, html_url = _get_issue_fields(
+                issue
+            )
+        except (KeyError, TypeError):
+            continue
+        formatted.append(
+            {
+                "value": str(number),
+                "label": f"#{number} - {title}",
+                "state": state,
+                "created_at": created_at,
+                "updated_at": updated_at,
+                "html_url": html_url,
+            }
+        )
+    return formatted
+
+
 @github_reference_bp.route("/api/github/issues", methods=["GET"])
 @require_admin
 def get_repository_issues():
@@ -93,7 +138,7 @@ def get_repository_issues():
         logger.info("Fetching issues for repository")
 
         # Get GitHub API endpoint
-        endpoint = APIEndpoint.query.filter_by(name="github").first()
+        endpoint = get_github_endpoint()
         if not endpoint:
             logger.error("GitHub API endpoint not configured")
             _raise_github_error("GitHub API endpoint not configured", 500)
@@ -106,13 +151,7 @@ def get_repository_issues():
             logger.error("No valid GitHub token available")
             _raise_github_error("No valid GitHub token configured", 401)
 
-        # Create an event loop and run the async function
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            issues = loop.run_until_complete(handler.get_repository_issues(owner, repo))
-        finally:
-            loop.close()
+        issues = run_coroutine(handler.get_repository_issues(owner, repo))
 
         if not isinstance(issues, list):
             logger.error("Invalid response format from GitHub API")
@@ -121,29 +160,7 @@ def get_repository_issues():
         # Format issues for dropdown
         formatted_issues = {
             "repository": f"{owner}/{repo}",
-            "issues": [
-                {
-                    "value": str(issue["number"]),
-                    "label": f'#{issue["number"]} - {issue["title"]}',
-                    "state": issue["state"],
-                    "created_at": issue["created_at"],
-                    "updated_at": issue["updated_at"],
-                    "html_url": issue["html_url"],
-                }
-                for issue in issues
-                if isinstance(issue, dict)
-                and all(
-                    k in issue
-                    for k in [
-                        "number",
-                        "title",
-                        "state",
-                        "created_at",
-                        "updated_at",
-                        "html_url",
-                    ]
-                )
-            ],
+            "issues": _format_issues(issues),
         }
 
         logger.debug("Formatted issues response")
@@ -172,7 +189,7 @@ def get_issue_content(owner, repo, issue_number):
     """Get content of a specific GitHub issue."""
     try:
         # Get GitHub API endpoint
-        endpoint = APIEndpoint.query.filter_by(name="github").first()
+        endpoint = get_github_endpoint()
         if not endpoint:
             logger.error("GitHub API endpoint not configured")
             return jsonify({"error": "GitHub API endpoint not configured"}), 500
@@ -188,17 +205,7 @@ def get_issue_content(owner, repo, issue_number):
         handler.token = session["github_token"]
 
         try:
-            # Create event loop if it doesn't exist
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-
-            # Run async operations in the event loop
-            issue = loop.run_until_complete(
-                handler.get_issue_content(owner, repo, issue_number)
-            )
+            issue = run_coroutine(handler.get_issue_content(owner, repo, issue_number))
             if not issue:
                 logger.error("Issue not found")
                 return jsonify({"error": "Issue not found"}), 404
@@ -206,7 +213,7 @@ def get_issue_content(owner, repo, issue_number):
             # Count tokens for the issue content
             content = issue.get("body", "")
             token_count, _ = (
-                loop.run_until_complete(token_service.count_tokens(content))
+                run_coroutine(token_service.count_tokens(content))
                 if content
                 else (0, None)
             )
@@ -241,22 +248,15 @@ def validate_token():
 
     try:
         # Get GitHub API endpoint
-        endpoint = APIEndpoint.query.filter_by(name="github").first()
+        endpoint = get_github_endpoint()
         if not endpoint:
             return jsonify({"error": "GitHub API endpoint not configured"}), 500
 
         # Initialize GitHub API handler
         handler = GitHubAPIHandler(endpoint)
 
-        # Create event loop if it doesn't exist
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
         # Validate token
-        is_valid = loop.run_until_complete(handler.validate_token(token))
+        is_valid = run_coroutine(handler.validate_token(token))
 
         return jsonify({"valid": is_valid})
 
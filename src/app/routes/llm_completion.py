@@ -20,8 +20,8 @@ llm_service = LLMService()
 def generate_completion():
     """Generate completion using the specified provider."""
     try:
-        data = request.get_json()
-        if not data:
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data, dict):
             return jsonify({"error": "No data provided"}), 400
 
         provider = data.get("provider")
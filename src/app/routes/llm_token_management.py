@@ -1,13 +1,20 @@
 from __future__ import annotations
 
+import asyncio
+import concurrent.futures
+import hashlib
 import logging
+import os
+import time
 
 from flask import Blueprint, jsonify, request, session
-from litellm import completion
+from litellm import acompletion
 
 from src.app.auth import require_admin
 from src.app.models.api_endpoint import APIEndpoint
 from src.app.models.db import db
+from src.app.utils.event_loop import run_coroutine
+from src.app.utils.ttl_cache import TTLCache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,6 +27,99 @@ PROVIDER_MODELS = {
     "google": "gemini/gemini-1.5-pro",
 }
 
+# Error returned for any provider not listed above
+INVALID_PROVIDER_MESSAGE = (
+    f"Invalid provider. Must be one of: {', '.join(PROVIDER_MODELS)}"
+)
+
+# Session key holding each provider's token
+PROVIDER_TOKEN_KEYS = {provider: f"{provider}_token" for provider in PROVIDER_MODELS}
+
+# Bounds on the test completion so a slow provider cannot pin a worker
+TOKEN_VALIDATION_TIMEOUT_SECONDS = 10.0
+TOKEN_VALIDATION_RETRIES = 1
+
+# Caps on test completions so a burst of token saves cannot trip provider
+# rate limits: calls in flight overall, and calls per minute per provider
+TOKEN_VALIDATION_CONCURRENCY = int(os.getenv("LLM_INFLIGHT_LIMIT", "4"))
+TOKEN_VALIDATION_RPM = 15
+
+# Longest a save waits for its test completion, queueing included
+TOKEN_VALIDATION_WAIT_SECONDS = 30.0
+
+# Successful validations are reused for this long; failures are never cached
+TOKEN_VALIDATION_CACHE_TTL_SECONDS = 300.0
+TOKEN_VALIDATION_CACHE_SIZE = 1024
+
+ENDPOINT_CACHE_TTL_SECONDS = 60.0
+
+# Detached provider endpoints, keyed by provider name
+_endpoint_cache = TTLCache(ENDPOINT_CACHE_TTL_SECONDS)
+_endpoint_cache.invalidate_on(APIEndpoint)
+
+# Providers and token digests that recently passed validation
+_validation_cache = TTLCache(
+    TOKEN_VALIDATION_CACHE_TTL_SECONDS, max_entries=TOKEN_VALIDATION_CACHE_SIZE
+)
+
+
+class _RateLimiter:
+    """Token bucket allowing a fixed number of acquisitions per minute."""
+
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.refill_per_second = per_minute / 60.0
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a call is allowed, then consume one token."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.updated_at) * self.refill_per_second,
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.refill_per_second)
+
+
+# Only used from the shared background event loop
+_validation_slots = asyncio.Semaphore(TOKEN_VALIDATION_CONCURRENCY)
+_provider_rate_limits = {
+    provider: _RateLimiter(TOKEN_VALIDATION_RPM) for provider in PROVIDER_MODELS
+}
+
+
+async def _run_validation_completion(
+    provider: str, model: str, messages: list[dict], token: str
+) -> None:
+    """Make the test completion within the concurrency and rate limits."""
+    started = time.monotonic()
+    # Wait out the provider's own limit before taking a shared slot, so one
+    # busy provider cannot hold every slot while it sleeps
+    await _provider_rate_limits[provider].acquire()
+    async with _validation_slots:
+        logger.debug("Validation slot acquired after %.2fs", time.monotonic() - started)
+        try:
+            await acompletion(
+                model=model,
+                messages=messages,
+                api_key=token,
+                max_tokens=1,
+                timeout=TOKEN_VALIDATION_TIMEOUT_SECONDS,
+                num_retries=TOKEN_VALIDATION_RETRIES,
+            )
+        finally:
+            logger.debug(
+                "Validation slot released after %.2fs", time.monotonic() - started
+            )
+
 
 def validate_llm_token(provider: str, token: str) -> tuple[bool, str | None]:
     """Validate an LLM API token by making a test request.
@@ -36,12 +136,24 @@ def validate_llm_token(provider: str, token: str) -> tuple[bool, str | None]:
         if not model:
             return False, f"Invalid provider: {provider}"
 
+        # Key on a digest so raw tokens are never held in the cache
+        cache_key = (provider, hashlib.sha256(token.encode()).digest())
+        if _validation_cache.get(cache_key):
+            return True, None
+
         messages = [{"role": "user", "content": "test"}]
         try:
-            completion(model=model, messages=messages, api_key=token, max_tokens=1)
+            run_coroutine(
+                _run_validation_completion(provider, model, messages, token),
+                timeout=TOKEN_VALIDATION_WAIT_SECONDS,
+            )
+        except concurrent.futures.TimeoutError:
+            logger.warning("Timed out validating %s token", provider)
+            return False, "Token validation timed out, please try again"
         except Exception as e:
             logger.exception("Error during LLM completion")
             return False, f"Error during LLM completion: {e}"
+        _validation_cache.set(cache_key, value=True)
 
     except Exception as e:
         logger.exception("Error validating LLM token")
@@ -59,9 +171,17 @@ def get_or_create_endpoint(provider: str) -> APIEndpoint:
     Returns:
         APIEndpoint object
     """
+    endpoint = _endpoint_cache.get(provider)
+    if endpoint is not None:
+        return endpoint
+
     endpoint = db.session.query(APIEndpoint).filter_by(name=provider).first()
 
-    if not endpoint:
+    if endpoint:
+        # Detach so later commits in other requests cannot expire it
+        db.session.expunge(endpoint)
+        _endpoint_cache.set(provider, endpoint)
+    else:
         endpoint = APIEndpoint(
             name=provider,
             type="llm",
@@ -97,11 +217,7 @@ def _validate_save_token_request(
     if not isinstance(token, str):
         return False, "Token must be a string", 400
     if provider not in PROVIDER_MODELS:
-        return (
-            False,
-            f'Invalid provider. Must be one of: {", ".join(PROVIDER_MODELS.keys())}',
-            400,
-        )
+        return False, INVALID_PROVIDER_MESSAGE, 400
 
     return True, (provider, token), None
 
@@ -111,11 +227,12 @@ def _validate_save_token_request(
 def save_llm_token():
     """Save an LLM provider token in session."""
     try:
-        if not request.is_json:
+        data = request.get_json(silent=True)
+        if data is None:
             return jsonify({"error": "Request must be JSON"}), 400
 
         # Validate request data
-        is_valid, result, status_code = _validate_save_token_request(request.get_json())
+        is_valid, result, status_code = _validate_save_token_request(data)
         if not is_valid:
             return jsonify({"error": result}), status_code
 
@@ -128,7 +245,7 @@ def save_llm_token():
 
         # Save token
         get_or_create_endpoint(provider)
-        session[f"{provider}_token"] = token
+        session[PROVIDER_TOKEN_KEYS[provider]] = token
         session.modified = True
         logger.info("Token saved for provider")
 
@@ -152,11 +269,7 @@ def _validate_token_request(data) -> tuple[bool, str | None, int | None]:
     if not provider:
         return False, "Provider is required", 400
     if provider not in PROVIDER_MODELS:
-        return (
-            False,
-            f'Invalid provider. Must be one of: {", ".join(PROVIDER_MODELS.keys())}',
-            400,
-        )
+        return False, INVALID_PROVIDER_MESSAGE, 400
 
     return True, provider, None
 
@@ -166,14 +279,15 @@ def _validate_token_request(data) -> tuple[bool, str | None, int | None]:
 def delete_llm_token():
     """Delete an LLM provider token from session."""
     try:
-        if not request.is_json:
+        data = request.get_json(silent=True)
+        if data is None:
             return jsonify({"error": "Request must be JSON"}), 400
-        is_valid, result, status_code = _validate_token_request(request.get_json())
+        is_valid, result, status_code = _validate_token_request(data)
         if not is_valid:
             return jsonify({"error": result}), status_code
 
         provider = result
-        token_key = f"{provider}_token"
+        token_key = PROVIDER_TOKEN_KEYS[provider]
 
         if token_key in session:
             session.pop(token_key)
@@ -194,13 +308,9 @@ def delete_llm_token():
 def get_llm_token(provider: str):
     """Get a stored LLM provider token."""
     if provider not in PROVIDER_MODELS:
-        return jsonify(
-            {
-                "error": f'Invalid provider. Must be one of: {", ".join(PROVIDER_MODELS.keys())}'
-            }
-        ), 400
+        return jsonify({"error": INVALID_PROVIDER_MESSAGE}), 400
 
-    token = session.get(f"{provider}_token")
+    token = session.get(PROVIDER_TOKEN_KEYS[provider])
     if token:
         return jsonify({"token": token})
     return jsonify({"error": "No token found"}), 404
@@ -209,17 +319,21 @@ def get_llm_token(provider: str):
 @llm_token_bp.route("/api/llm/providers", methods=["GET"])
 def list_providers():
     """List available LLM providers and their models."""
-    return jsonify(
+    response = jsonify(
         {
             "providers": {
                 provider: {
                     "model": model,
-                    "has_token": f"{provider}_token" in session,
+                    "has_token": PROVIDER_TOKEN_KEYS[provider] in session,
                 }
                 for provider, model in PROVIDER_MODELS.items()
             }
         }
     )
+    # has_token depends on the session, so caches must key on the cookie
+    response.vary.add("Cookie")
+    response.add_etag()
+    return response.make_conditional(request)
 
 
 @llm_token_bp.route("/api/llm/token/status", methods=["GET"])
@@ -227,10 +341,10 @@ def list_providers():
 def get_token_status():
     """Get the status of all LLM provider tokens."""
     try:
-        status = {}
-        for provider in PROVIDER_MODELS:
-            token = session.get(f"{provider}_token")
-            status[provider] = token is not None
+        status = {
+            provider: token_key in session
+            for provider, token_key in PROVIDER_TOKEN_KEYS.items()
+        }
         return jsonify(status)
     except Exception as e:
         logger.exception("Error getting token status")
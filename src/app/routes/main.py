@@ -2,10 +2,43 @@
 
 from __future__ import annotations
 
-from flask import Blueprint, current_app, render_template
+from typing import Any
+
+from flask import Blueprint, current_app, render_template, request, session
+
+from src.app.utils.ttl_cache import TTLCache
 
 main_bp = Blueprint("main", __name__)
 
+PAGE_CACHE_TTL_SECONDS = 600.0
+
+# Rendered static pages, keyed by template name and script root
+_page_cache = TTLCache(PAGE_CACHE_TTL_SECONDS)
+
+
+def _render_cached(template_name: str, **context: Any) -> str:
+    """Render a page that only varies with flashed messages, caching the HTML.
+
+    Pages with pending flashed messages are rendered normally and not cached,
+    and caching is skipped while templates auto-reload during development.
+
+    Args:
+        template_name: Template to render
+        **context: Template context, which must be the same for every request
+
+    Returns:
+        str: Rendered HTML
+    """
+    if "_flashes" in session or current_app.jinja_env.auto_reload:
+        return render_template(template_name, **context)
+
+    key = (template_name, request.script_root)
+    html = _page_cache.get(key)
+    if html is None:
+        html = render_template(template_name, **context)
+        _page_cache.set(key, html)
+    return html
+
 
 @main_bp.route("/")
 def home() -> str:
@@ -15,7 +48,7 @@ def home() -> str:
         str: Rendered HTML template for the home page.
     """
     current_app.logger.info("Rendering home page")
-    return render_template("home.html", admin_token=current_app.config["ADMIN_TOKEN"])
+    return _render_cached("home.html", admin_token=current_app.config["ADMIN_TOKEN"])
 
 
 @main_bp.route("/about")
@@ -25,4 +58,4 @@ def about() -> str:
     Returns:
         str: Rendered HTML template for the about page.
     """
-    return render_template("about.html")
+    return _render_cached("about.html")
@@ -1,19 +1,95 @@
 from __future__ import annotations
 
+import asyncio
+import concurrent.futures
 import json
+import os
+import re
 import traceback
+from collections import deque
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import TYPE_CHECKING, Any
 
-import requests
+import httpx
 from flask import Blueprint, Response, current_app, jsonify, request
 from sqlalchemy.exc import SQLAlchemyError
 
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from datetime import datetime
+
 from src.app.models.api_endpoint import APIEndpoint
+from src.app.models.db import db
 from src.app.models.reference_models import PersistentVariable
 from src.app.services.file_path_validator import FilePathValidator
 from src.app.services.file_reference_handler import FileReferenceHandler
+from src.app.utils.event_loop import run_coroutine
+from src.app.utils.response_utils import not_modified_response
+from src.app.utils.ttl_cache import TTLCache
 
 preview_bp = Blueprint("preview", __name__)
 
+PREVIEW_HTTP_LIMITS = httpx.Limits(
+    max_keepalive_connections=20, max_connections=100, keepalive_expiry=30.0
+)
+PREVIEW_HTTP_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+
+# Upstream bodies larger than this (after decompression) are rejected
+PREVIEW_MAX_RESPONSE_BYTES = 2 * 1024 * 1024
+
+# Most endpoint previews accepted in one batch request
+PREVIEW_BATCH_MAX_SIZE = 20
+
+# HTTP methods a batch preview item may use
+PREVIEW_BATCH_METHODS = frozenset({"GET", "POST", "PUT", "PATCH", "DELETE"})
+
+_client: httpx.AsyncClient | None = None
+
+PREVIEW_CACHE_TTL_SECONDS = 60.0
+
+# Opening of an editor file reference, "@[file:<path>]"
+FILE_REFERENCE_PREFIX = "@[file:"
+
+# Leading text of a JSON object or array body
+_JSON_BODY_START = re.compile(r"\s*[\[{]")
+
+# Files larger than this are streamed instead of being read into memory
+PREVIEW_STREAM_THRESHOLD_BYTES = 1024 * 1024
+PREVIEW_STREAM_CHUNK_SIZE = 64 * 1024
+
+# Chunks of a streamed preview are tokenized on these threads while the next
+# chunk is read and sent; pending chunks are capped to bound memory
+PREVIEW_TOKEN_WORKERS = 4
+PREVIEW_TOKEN_MAX_PENDING = 16
+
+_token_count_pool = concurrent.futures.ThreadPoolExecutor(
+    max_workers=PREVIEW_TOKEN_WORKERS, thread_name_prefix="preview-tokens"
+)
+
+# Detached endpoints and serialized variables, keyed by name
+_endpoint_cache = TTLCache(PREVIEW_CACHE_TTL_SECONDS)
+_variable_cache = TTLCache(PREVIEW_CACHE_TTL_SECONDS)
+_endpoint_cache.invalidate_on(APIEndpoint)
+_variable_cache.invalidate_on(PersistentVariable)
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Get the pooled client used for endpoint previews.
+
+    The client is only used from the shared background event loop, which
+    owns its connections. Cookies are never stored, so one user's preview
+    cannot carry another user's upstream session.
+    """
+    global _client  # noqa: PLW0603
+    if _client is None:
+        _client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(limits=PREVIEW_HTTP_LIMITS, retries=2),
+            timeout=PREVIEW_HTTP_TIMEOUT,
+            follow_redirects=True,
+            cookies=CookieJar(DefaultCookiePolicy(allowed_domains=[])),
+        )
+    return _client
+
 
 @preview_bp.route("/api/preview/file", methods=["GET"])
 async def preview_file():
@@ -23,37 +99,123 @@ async def preview_file():
             current_app.logger.warning("[API Preview] No file path provided")
             return jsonify({"error": "No file path provided"}), 400
 
-        if file_path.startswith("@[file:") and file_path.endswith("]"):
-            file_path = file_path[6:-1]
+        if file_path.startswith(FILE_REFERENCE_PREFIX) and file_path.endswith("]"):
+            file_path = file_path[len(FILE_REFERENCE_PREFIX) : -1]
 
         validator = FilePathValidator()
-        is_valid, error_message = await validator.validate_path(file_path)
+        is_valid, error_message, _ = await validator.validate_path(file_path)
         if not is_valid:
             current_app.logger.error("[API Preview] File path not allowed")
             return jsonify({"error": error_message}), 403
 
-        handler = FileReferenceHandler()
-        try:
-            content = handler.read_file(file_path)
-        except Exception as e:
-            current_app.logger.exception("[API Preview] Error reading file")
-            return jsonify({"error": f"Error reading file: {e!s}"}), 500
-
-        try:
-            token_service = current_app.token_service
-            token_count, _ = await token_service.count_tokens(content)
-            current_app.logger.info("Token count for file {file_path}: {token_count}")
-        except Exception:
-            current_app.logger.exception("Error counting tokens")
-            token_count = None
-
-        return jsonify(
-            {"content": content, "path": file_path, "token_count": token_count}
-        ), 200
+        response = await _file_preview_response(file_path)
 
     except Exception as e:
         current_app.logger.exception("[API Preview] Unexpected error")
         return jsonify({"error": f"Failed to get file content: {e!s}"}), 500
+    else:
+        return response
+
+
+async def _file_preview_response(file_path: str) -> Response | tuple[Response, int]:
+    """Build the preview of an allowed file.
+
+    Size and mtime identify the file version, so a client that already has it
+    gets a 304 without the file being read.
+    """
+    handler = FileReferenceHandler()
+    try:
+        file_stat = await asyncio.to_thread(os.stat, file_path)
+        etag = f"{file_stat.st_mtime_ns:x}-{file_stat.st_size:x}"
+        response = not_modified_response(etag)
+        if response is not None:
+            return response
+
+        if file_stat.st_size > PREVIEW_STREAM_THRESHOLD_BYTES:
+            response = _stream_file_preview(
+                handler.iter_file(file_path, PREVIEW_STREAM_CHUNK_SIZE), file_path
+            )
+            response.set_etag(etag)
+            return response
+        content = handler.read_file(file_path)
+    except Exception as e:
+        current_app.logger.exception("[API Preview] Error reading file")
+        return jsonify({"error": f"Error reading file: {e!s}"}), 500
+
+    try:
+        token_service = current_app.token_service
+        token_count, _ = await token_service.count_tokens(content)
+        current_app.logger.info("Token count for file {file_path}: {token_count}")
+    except Exception:
+        current_app.logger.exception("Error counting tokens")
+        token_count = None
+
+    response = jsonify(
+        {"content": content, "path": file_path, "token_count": token_count}
+    )
+    response.set_etag(etag)
+    return response
+
+
+def _stream_file_preview(chunks: Iterator[str], file_path: str) -> Response:
+    """Stream a large file as the same JSON body preview_file returns.
+
+    Chunks are tokenized on a worker pool while later chunks are read and
+    sent, so the count comes last in the body and is approximate at chunk
+    boundaries.
+
+    Args:
+        chunks: The file contents, chunk by chunk
+        file_path: Path to report in the response
+
+    Returns:
+        Response: The JSON response, streamed in chunks
+    """
+    # Bound now: the generator runs after the app context is gone
+    logger = current_app.logger
+    token_service = current_app.token_service
+
+    def generate():
+        token_count = 0
+        pending: deque[concurrent.futures.Future[int]] = deque()
+
+        def collect(future: concurrent.futures.Future[int]) -> None:
+            nonlocal token_count
+            try:
+                count = future.result()
+            except Exception:
+                logger.exception("Error counting tokens")
+                token_count = None
+            else:
+                if token_count is not None:
+                    token_count += count
+
+        yield '{"content": "'
+        try:
+            for chunk in chunks:
+                if token_count is not None:
+                    pending.append(
+                        _token_count_pool.submit(
+                            token_service.count_chunk_tokens, chunk
+                        )
+                    )
+                # Strip the surrounding quotes to splice into the open string
+                yield json.dumps(chunk)[1:-1]
+                while len(pending) > PREVIEW_TOKEN_MAX_PENDING or (
+                    pending and pending[0].done()
+                ):
+                    collect(pending.popleft())
+            while pending:
+                collect(pending.popleft())
+        finally:
+            for future in pending:
+                future.cancel()
+        yield (
+            f'", "path": {json.dumps(file_path)}, '
+            f'"token_count": {json.dumps(token_count)}}}'
+        )
+
+    return Response(generate(), mimetype="application/json")
 
 
 def _make_error_response(
@@ -74,12 +236,19 @@ def _get_endpoint(
         current_app.logger.warning("[API Preview] No endpoint name provided")
         return None, _make_error_response("No endpoint provided", 400)
 
+    endpoint = _endpoint_cache.get(endpoint_name)
+    if endpoint is not None:
+        return endpoint, None
+
     try:
         endpoint = APIEndpoint.query.filter_by(name=endpoint_name).first()
         if not endpoint:
             current_app.logger.error("[API Preview] Endpoint not found")
             return None, _make_error_response("Endpoint not found", 404)
         current_app.logger.info("[API Preview] Found endpoint")
+        # Detach so later commits in other requests cannot expire it
+        db.session.expunge(endpoint)
+        _endpoint_cache.set(endpoint_name, endpoint)
     except SQLAlchemyError:
         current_app.logger.exception("[API Preview] Database error")
         return None, _make_error_response("Database error occurred", 500)
@@ -87,61 +256,104 @@ def _get_endpoint(
 
 
 def _prepare_request_params(
-    endpoint: APIEndpoint, test_params: str
+    endpoint: APIEndpoint, test_params: str | dict
 ) -> tuple[dict, dict | None]:
-    """Prepare headers and parameters for the request."""
-    # Parse headers
-    if isinstance(endpoint.headers, str):
+    """Prepare headers and parameters for the request.
+
+    test_params is either a JSON string or already-decoded parameters.
+    """
+    # Copy: auth headers are added below and the parsed headers are shared
+    headers = dict(endpoint.parsed_headers)
+
+    # Parse parameters
+    if isinstance(test_params, str):
         try:
-            headers = json.loads(endpoint.headers)
+            params = json.loads(test_params)
         except json.JSONDecodeError:
-            headers = {}
-    elif isinstance(endpoint.headers, dict):
-        headers = endpoint.headers
+            current_app.logger.exception("[API Preview] Invalid JSON in parameters")
+            return headers, None
     else:
-        headers = {}
-
-    # Parse parameters
-    try:
-        params = json.loads(test_params)
-    except json.JSONDecodeError:
-        current_app.logger.exception("[API Preview] Invalid JSON in parameters")
-        return headers, None
+        params = test_params
 
     # Add authentication
-    if endpoint.auth_type == "token":
-        headers["Authorization"] = f"Bearer {endpoint.auth_token}"
-    elif endpoint.auth_type == "basic":
-        import base64
-
-        auth_string = base64.b64encode(f":{endpoint.auth_token}".encode()).decode()
-        headers["Authorization"] = f"Basic {auth_string}"
+    authorization = endpoint.authorization_header
+    if authorization is not None:
+        headers["Authorization"] = authorization
 
     current_app.logger.info("[API Preview] Request setup completed")
     return headers, params
 
 
-def _make_request(
+def _decode_response_body(response: httpx.Response, body: bytes) -> tuple[Any, str]:
+    """Decode a preview response as JSON when it is JSON, else as text.
+
+    The body is only handed to the JSON parser when the Content-Type says
+    JSON or the text opens like a JSON object or array, so HTML and other
+    text bodies skip a parse that is bound to fail.
+
+    Args:
+        response: The upstream response, for its headers and encoding
+        body: The response body read so far
+
+    Returns:
+        Tuple of (decoded content, content type to report)
+    """
+    declared_type = response.headers.get("Content-Type", "text/plain")
+    text = body.decode(response.encoding or "utf-8", errors="replace")
+    if "json" in declared_type or _JSON_BODY_START.match(text):
+        try:
+            return json.loads(text), "application/json"
+        except json.JSONDecodeError:
+            pass
+    return text, declared_type
+
+
+async def _read_limited(response: httpx.Response, limit: int) -> bytes | None:
+    """Read a streamed response body, giving up once it exceeds limit bytes.
+
+    Returns:
+        The body, or None if it is too large
+    """
+    content_length = response.headers.get("Content-Length", "")
+    if content_length.isdigit() and int(content_length) > limit:
+        return None
+
+    body = bytearray()
+    async for chunk in response.aiter_bytes():
+        body += chunk
+        if len(body) > limit:
+            return None
+    return bytes(body)
+
+
+async def _make_request(
     method: str, url: str, headers: dict, params: dict
 ) -> tuple[dict | None, tuple[Response, int] | None]:
-    """Make HTTP request and process response."""
+    """Make HTTP request and process response.
+
+    The body is streamed and the request is abandoned once it passes
+    PREVIEW_MAX_RESPONSE_BYTES, so an oversized upstream response is never
+    held in memory whole.
+    """
     try:
         current_app.logger.info("[API Preview] Making request")
-        response = requests.request(
+        async with _get_client().stream(
             method=method,
             url=url,
             headers=headers,
             params=params if method == "GET" else None,
             json=params if method != "GET" else None,
-            timeout=10,
-        )
-
-        try:
-            response_data = response.json()
-            content_type = "application/json"
-        except json.JSONDecodeError:
-            response_data = response.text
-            content_type = response.headers.get("Content-Type", "text/plain")
+        ) as response:
+            body = await _read_limited(response, PREVIEW_MAX_RESPONSE_BYTES)
+        if body is None:
+            current_app.logger.warning("[API Preview] Response too large")
+            return None, _make_error_response(
+                "Response too large",
+                502,
+                f"Upstream response exceeds {PREVIEW_MAX_RESPONSE_BYTES} bytes",
+            )
+
+        response_data, content_type = _decode_response_body(response, body)
 
         return {
             "status_code": response.status_code,
@@ -151,7 +363,7 @@ def _make_request(
             "response_time": response.elapsed.total_seconds(),
         }, None
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         current_app.logger.exception("[API Preview] Request failed")
         return None, _make_error_response("Request failed", 500, str(e))
 
@@ -177,8 +389,8 @@ def preview_endpoint():
             return _make_error_response("Invalid JSON in parameters", 400)
 
         # Make request
-        result, error_response = _make_request(
-            method, endpoint.base_url, headers, params
+        result, error_response = run_coroutine(
+            _make_request(method, endpoint.base_url, headers, params)
         )
         if error_response:
             return error_response
@@ -190,6 +402,118 @@ def preview_endpoint():
         return _make_error_response("Unexpected error", 500)
 
 
+def _error_result(error_response: tuple[Response, int]) -> dict:
+    """Turn an error response into an entry of a batch preview result."""
+    response, status_code = error_response
+    return {**response.get_json(), "status_code": status_code}
+
+
+async def _make_requests(requests: list[tuple[str, str, dict, dict]]) -> list:
+    """Make several preview requests concurrently over the shared client.
+
+    Returns:
+        Each request's _make_request result, or the exception it raised
+    """
+    return await asyncio.gather(
+        *(_make_request(*args) for args in requests), return_exceptions=True
+    )
+
+
+def _prepare_batch_item(
+    spec: Any, endpoints: dict[str, tuple]
+) -> tuple[tuple[str, str, dict, dict] | None, tuple[Response, int] | None]:
+    """Validate one batch preview item and build its _make_request arguments.
+
+    endpoints memoizes _get_endpoint results across the items of a batch.
+
+    Returns:
+        Tuple of (request arguments, error response)
+    """
+    if (
+        not isinstance(spec, dict)
+        or not isinstance(spec.get("endpoint") or "", str)
+        or not isinstance(spec.get("params", {}), str | dict)
+    ):
+        return None, _make_error_response("Invalid preview request", 400)
+
+    endpoint_name = spec.get("endpoint")
+    if endpoint_name not in endpoints:
+        endpoints[endpoint_name] = _get_endpoint(endpoint_name)
+    endpoint, error_response = endpoints[endpoint_name]
+    if error_response:
+        return None, error_response
+
+    method = spec.get("method", "GET")
+    if not isinstance(method, str) or method.upper() not in PREVIEW_BATCH_METHODS:
+        return None, _make_error_response("Unsupported method", 400)
+
+    headers, params = _prepare_request_params(endpoint, spec.get("params", {}))
+    if not isinstance(params, dict):
+        return None, _make_error_response("Invalid JSON in parameters", 400)
+
+    return (method.upper(), endpoint.base_url, headers, params), None
+
+
+@preview_bp.route("/api/preview/endpoint/batch", methods=["POST"])
+def preview_endpoint_batch():
+    """Preview several API endpoints in one request.
+
+    The body is a JSON list of {"endpoint", "method", "params"} objects, where
+    params is an object or a JSON string as in the GET route and method is one
+    of PREVIEW_BATCH_METHODS. The upstream requests run concurrently and the
+    response lists one entry per item, in order: the preview_endpoint result,
+    or an error object with its status_code.
+    """
+    try:
+        specs = request.get_json(silent=True)
+        if not isinstance(specs, list) or not specs:
+            return _make_error_response("Expected a non-empty JSON list", 400)
+        if len(specs) > PREVIEW_BATCH_MAX_SIZE:
+            return _make_error_response(
+                f"At most {PREVIEW_BATCH_MAX_SIZE} previews per batch", 400
+            )
+
+        current_app.logger.info("[API Preview] Received batch request")
+
+        results: list[dict | None] = [None] * len(specs)
+        pending: list[int] = []
+        requests: list[tuple[str, str, dict, dict]] = []
+        endpoints: dict[str, tuple] = {}
+        for index, spec in enumerate(specs):
+            prepared, error_response = _prepare_batch_item(spec, endpoints)
+            if error_response:
+                results[index] = _error_result(error_response)
+                continue
+            pending.append(index)
+            requests.append(prepared)
+
+        outcomes = run_coroutine(_make_requests(requests)) if requests else []
+        for index, outcome in zip(pending, outcomes, strict=True):
+            if isinstance(outcome, BaseException):
+                current_app.logger.error(
+                    "[API Preview] Unexpected error in batch", exc_info=outcome
+                )
+                error_response = _make_error_response("Unexpected error", 500)
+                results[index] = _error_result(error_response)
+            else:
+                result, error_response = outcome
+                results[index] = result or _error_result(error_response)
+
+        return jsonify(results)
+
+    except Exception:
+        current_app.logger.exception("[API Preview] Unexpected error")
+        return _make_error_response("Unexpected error", 500)
+
+
+def _variable_preview_response(preview: dict, updated_at: datetime) -> Response:
+    """Build the variable preview, answering 304 if the client copy is current."""
+    response = jsonify(preview)
+    response.last_modified = updated_at
+    response.add_etag()
+    return response.make_conditional(request)
+
+
 @preview_bp.route("/api/preview/variable", methods=["GET"])
 def preview_variable():
     try:
@@ -198,6 +522,10 @@ def preview_variable():
             current_app.logger.warning("[API Preview] No variable name provided")
             return jsonify({"error": "No variable name provided"}), 400
 
+        cached = _variable_cache.get(var_name)
+        if cached is not None:
+            return _variable_preview_response(*cached)
+
         try:
             variable = PersistentVariable.query.filter_by(name=var_name).first()
             if variable:
@@ -210,13 +538,13 @@ def preview_variable():
             current_app.logger.exception("[API Preview] Database error")
             return jsonify({"error": "Database error occurred"}), 500
 
-        return jsonify(
-            {
-                "name": variable.name,
-                "value": variable.value,
-                "lastUpdated": variable.updated_at.isoformat(),
-            }
-        )
+        preview = {
+            "name": variable.name,
+            "value": variable.value,
+            "lastUpdated": variable.updated_at.isoformat(),
+        }
+        _variable_cache.set(var_name, (preview, variable.updated_at))
+        return _variable_preview_response(preview, variable.updated_at)
 
     except Exception as e:
         current_app.logger.exception("[API Preview] Unexpected error")
@@ -2,37 +2,114 @@
 
 from __future__ import annotations
 
+import asyncio
+import contextvars
 import logging
 import os
+import queue
 import re
+import stat
+import threading
+import time
+from functools import lru_cache
 from http import HTTPStatus
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import tiktoken
 from flask import (
     Blueprint,
     Response,
     current_app,
+    g,
     jsonify,
     render_template,
     request,
     session,
 )
 from flask_login import login_required
+from litellm import completion
 from werkzeug.exceptions import BadRequest
 
 from src.app.models.api_endpoint import APIEndpoint
 from src.app.models.reference_models import PersistentVariable
+from src.app.services.file_reference_handler import FileReferenceHandler
 from src.app.services.github_api_handler import GitHubAPIHandler
+from src.app.services.llm_service import LLMService
 from src.app.services.prompt_handler import FenceFormat
 from src.app.services.prompt_service import PromptService
+from src.app.utils.event_loop import run_coroutine_async
+from src.app.utils.tokenizer import get_encoding
+from src.app.utils.ttl_cache import TTLCache
 from src.app.validators.base import ValidationError
 from src.app.validators.prompt_validators import PromptFenceValidator, PromptValidator
 
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+# Provider SDKs are optional; only the matching token validator needs them
+try:
+    import openai
+except ImportError:
+    openai = None
+
+try:
+    import anthropic
+except ImportError:
+    anthropic = None
+
 logger = logging.getLogger(__name__)
 
 prompts_bp = Blueprint("prompts", __name__, url_prefix="/prompts")
 
+# Any @[type:value] reference, capturing type and value
+_REF_PATTERN = re.compile(r"@\[(\w+):([^\]]+)\]")
+
+# A single file reference, capturing the path
+_FILE_REF_PATTERN = re.compile(r"@\[file:([^\]]*)\]")
+
+
+def _ref_key(match: re.Match[str]) -> tuple[str, str]:
+    """Get the (type, value) a reference match is looked up by."""
+    return match.group(1), match.group(2).strip()
+
+
+# Workspace file listings are reused for this long; a change directly in the
+# workspace root shows up sooner, as it changes the root's mtime
+WORKSPACE_FILES_TTL_SECONDS = 30.0
+
+# File listings keyed by (workspace, root mtime)
+_files_cache = TTLCache(WORKSPACE_FILES_TTL_SECONDS, max_entries=8)
+
+# Referenced files are tokenized this many characters at a time
+TOKEN_COUNT_CHUNK_SIZE = 1024 * 1024
+
+# Upper bound on a provider round-trip when validating an API token
+TOKEN_VALIDATION_TIMEOUT_SECONDS = 5
+
+# Generated text is sent once this many characters are pending, or once this
+# long has passed since the last event, whichever comes first
+STREAM_FLUSH_CHARS = 512
+STREAM_FLUSH_SECONDS = 0.05
+
+# Queued by _read_stream once the provider stream is exhausted
+_STREAM_END = object()
+
+# Workspace used by is_path_allowed when none is configured
+_DEFAULT_WORKSPACE = Path(__file__).resolve().parent
+
+
+@lru_cache(maxsize=64)
+def _resolve_dir(path: str | Path) -> Path:
+    """Resolve a configured directory, memoized across requests.
+
+    Args:
+        path: Directory as given in the app config
+
+    Returns:
+        Path: The resolved absolute path
+    """
+    return Path(path).resolve()
+
 
 def _raise_no_data() -> None:
     """Raise BadRequest for missing data."""
@@ -47,27 +124,67 @@ def _raise_no_content() -> None:
 
 
 def get_files() -> list[dict]:
-    """Get list of files from the workspace."""
-    files = []
-    workspace = Path(current_app.config.get("WORKSPACE_PATH", Path.cwd())).resolve()
+    """Get list of files from the workspace, cached for a short TTL.
+
+    The returned list is shared between callers and must not be modified.
+    """
+    workspace = os.fspath(
+        _resolve_dir(current_app.config.get("WORKSPACE_PATH", Path.cwd()))
+    )
+    try:
+        key = (workspace, Path(workspace).stat().st_mtime_ns)
+    except OSError:
+        return _scan_files(workspace)
+
+    files = _files_cache.get(key)
+    if files is None:
+        files = _scan_files(workspace)
+        _files_cache.set(key, files)
+    return files
 
-    for file_path in workspace.rglob("*"):
-        if file_path.is_file():
-            try:
-                rel_path = file_path.relative_to(workspace)
-                files.append({"name": file_path.name, "path": str(rel_path)})
-            except ValueError:
-                continue
+
+def _scan_files(workspace: str) -> list[dict]:
+    """List every file under workspace with its workspace-relative path.
+
+    Walks the tree with os.scandir, whose entries carry their file type, so
+    most files cost no extra stat call. Like Path.rglob, symlinked files are
+    listed but symlinked directories are not descended into, and unreadable
+    directories are skipped.
+    """
+    files = []
+    stack = [workspace]
+    while stack:
+        subdirs = []
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file():
+                        files.append(
+                            {
+                                "name": entry.name,
+                                "path": os.path.relpath(entry.path, workspace),
+                            }
+                        )
+        except OSError:
+            continue
+        # Reversed so directories are walked in the order they were listed
+        stack.extend(reversed(subdirs))
 
     return files
 
 
+# Fence formats offered by the editor; FenceFormat does not change at runtime
+FENCE_FORMATS = [
+    {"id": format.value, "name": format.name.replace("_", " ").title()}
+    for format in FenceFormat
+]
+
+
 def get_fence_formats() -> list[dict]:
     """Get available fence formats for the template."""
-    return [
-        {"id": format.value, "name": format.name.replace("_", " ").title()}
-        for format in FenceFormat
-    ]
+    return FENCE_FORMATS
 
 
 @prompts_bp.route("/new", methods=["GET"])
@@ -174,8 +291,10 @@ def update_prompt(prompt_id: int) -> tuple[dict, int]:
             return jsonify({"error": str(e)}), HTTPStatus.BAD_REQUEST
 
         content = "\n".join(
-            f"<{fence['name']}>\n{fence['content']}\n</{fence['name']}>"
-            for fence in data["fences"]
+            [
+                f"<{fence['name']}>\n{fence['content']}\n</{fence['name']}>"
+                for fence in data["fences"]
+            ]
         )
         data["content"] = content
 
@@ -251,8 +370,8 @@ async def preview_prompt():
         _raise_no_content()
 
     try:
-        # Extract file path from content
-        match = re.match(r"@\[file:(.*?)\]", content)
+        # A preview of just one file is fenced; anything else is resolved below
+        match = _FILE_REF_PATTERN.fullmatch(content.strip())
         if match:
             file_path = match.group(1)
             raw_content, error = await get_reference_content(
@@ -265,20 +384,22 @@ async def preview_prompt():
             formatted_content = f"<fence>\n{raw_content}\n</fence>"
             return formatted_content, HTTPStatus.OK, {"Content-Type": "text/plain"}
 
-        # Find all references in the content
-        ref_pattern = r"@\[(\w+):([^\]]+)\]"
-        matches = list(re.finditer(ref_pattern, content))
+        # Each distinct reference is looked up once, all of them concurrently
+        keys = list(dict.fromkeys(map(_ref_key, _REF_PATTERN.finditer(content))))
         references = {}
 
-        resolved_content = content
-        for match in matches:
-            ref_type = match.group(1)
-            ref_value = match.group(2).strip()
-            ref_content, error = await get_reference_content(ref_type, ref_value)
+        results = await asyncio.gather(
+            *(get_reference_content(ref_type, value) for ref_type, value in keys)
+        )
+
+        resolved = {}
+        for key, (ref_content, error) in zip(keys, results, strict=True):
             if error:
                 return jsonify({"error": error}), HTTPStatus.BAD_REQUEST
+            resolved[key] = ref_content
 
-            resolved_content = resolved_content.replace(match.group(0), ref_content)
+        # One pass, so inserted content is never searched for references
+        resolved_content = _REF_PATTERN.sub(lambda m: resolved[_ref_key(m)], content)
 
         formatted_content = format_fence_content(resolved_content, "", "")
 
@@ -337,12 +458,43 @@ def count_tokens_local(text):
     if not text:
         return 0
     try:
-        encoding = tiktoken.get_encoding("cl100k_base")
-        return len(encoding.encode(text))
+        return len(get_encoding().encode(text))
     except Exception:
         return len(text.split()) if text else 0
 
 
+def count_tokens_from_path(path: Path) -> int:
+    """Count tokens in a file without reading all of it into memory.
+
+    The file is encoded in line-aligned chunks, so the total can differ
+    from encoding it whole only where a token would span a chunk boundary.
+
+    Args:
+        path: File to count
+
+    Returns:
+        int: Number of tokens in the file
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    encoding = get_encoding()
+    chunks = FileReferenceHandler().iter_file(os.fspath(path), TOKEN_COUNT_CHUNK_SIZE)
+    return sum(len(encoding.encode_ordinary(chunk)) for chunk in chunks)
+
+
+async def _count_file_reference_tokens(value: str) -> int:
+    """Count tokens in a referenced file, or 0 if it is missing or not allowed."""
+    path = Path(value)
+    if not await asyncio.to_thread(path.is_file) or not is_path_allowed(path):
+        return 0
+    try:
+        return await asyncio.to_thread(count_tokens_from_path, path)
+    except OSError:
+        logger.exception("Error counting tokens in referenced file")
+        return 0
+
+
 @prompts_bp.route("/api/tokens/count", methods=["POST"])
 async def count_tokens():
     """Count tokens in text and references."""
@@ -353,43 +505,72 @@ async def count_tokens():
             return jsonify({"error": "No text provided"}), 400
 
         text = data["text"]
-        encoding = tiktoken.get_encoding("cl100k_base")
+        encoding = get_encoding()
 
-        ref_pattern = r"@\[(\w+):([^\]]+)\]"
-        content_only = re.sub(ref_pattern, "", text)
+        # Without references there is nothing to strip, look up or batch
+        if "@[" not in text:
+            content_tokens = len(encoding.encode_ordinary(text))
+            return jsonify(
+                {
+                    "content_tokens": content_tokens,
+                    "reference_tokens": 0,
+                    "total_tokens": content_tokens,
+                    "references": {},
+                    "success": True,
+                }
+            )
 
-        content_tokens = len(encoding.encode(content_only))
+        # One scan: literal text, then each reference's type and value in turn
+        parts = _REF_PATTERN.split(text)
+        content_only = "".join(parts[0::3])
 
         references = {}
         total_ref_tokens = 0
 
-        for match in re.finditer(ref_pattern, text):
-            ref = match.group(0).strip()
+        # Text to encode: the content first, then each resolved reference
+        texts = [content_only]
+        resolved_refs = []
+
+        # Every occurrence counts, but each distinct reference is fetched once
+        occurrences = [
+            (f"@[{ref_type}:{ref_value}]", (ref_type.lower(), ref_value.strip()))
+            for ref_type, ref_value in zip(parts[1::3], parts[2::3], strict=True)
+        ]
+        keys = list(dict.fromkeys(key for _, key in occurrences))
+
+        # Files are only counted, so they are streamed rather than read
+        file_keys = [key for key in keys if key[0] == "file"]
+        lookup_keys = [key for key in keys if key[0] != "file"]
+
+        # Look the references up concurrently; results keep key order
+        contents, file_counts = await asyncio.gather(
+            asyncio.gather(
+                *(
+                    get_reference_content(ref_type, value)
+                    for ref_type, value in lookup_keys
+                )
+            ),
+            asyncio.gather(*(_count_file_reference_tokens(v) for _, v in file_keys)),
+        )
 
-            if ":" not in ref:
-                references[ref] = 0
+        counts = dict(zip(file_keys, file_counts, strict=True))
+        for key, content in zip(lookup_keys, contents, strict=True):
+            if content is None or not isinstance(content, str):
+                counts[key] = 0
                 continue
 
-            ref_type, ref_value = ref.split(":", 1)
-            ref_type = ref_type.strip().lower()
-            ref_value = ref_value.strip()
-
-            content = await get_reference_content(ref_type, ref_value)
-
-            if content is None:
-                references[ref] = 0
-                continue
+            resolved_refs.append(key)
+            texts.append(content)
 
-            if not isinstance(content, str):
-                references[ref] = 0
-                continue
+        # One batched call; special-token text is counted as ordinary text
+        token_lists = encoding.encode_ordinary_batch(texts)
+        content_tokens = len(token_lists[0])
+        for key, tokens in zip(resolved_refs, token_lists[1:], strict=True):
+            counts[key] = len(tokens)
 
-            try:
-                ref_tokens = len(encoding.encode(content))
-                references[ref] = ref_tokens
-                total_ref_tokens += ref_tokens
-            except Exception:
-                references[ref] = 0
+        for ref, key in occurrences:
+            references[ref] = counts[key]
+            total_ref_tokens += counts[key]
 
         return jsonify(
             {
@@ -423,44 +604,102 @@ async def count_reference_tokens():
 
 def format_directory_tree(
     path: Path, prefix: str = "", is_last: bool = True
-) -> list[str]:
-    """Format directory contents as an ASCII tree.
+) -> Iterator[str]:
+    """Format directory contents as an ASCII tree, one line at a time.
+
+    The tree is walked iteratively with os.scandir, so deep trees cost no
+    recursion and callers can stream the lines without building the text.
+    Symlinked directories are listed but not descended into.
 
     Args:
         path: Directory path to format
         prefix: Current line prefix for indentation
         is_last: Whether this is the last item in current level
 
-    Returns:
-        list[str]: Lines of the tree
+    Yields:
+        str: Lines of the tree
     """
-    lines = []
-
     # Add current directory/file
     if path.parent != path:  # Skip root directory name
         connector = "└── " if is_last else "├── "
-        lines.append(f"{prefix}{connector}{path.name}")
+        yield f"{prefix}{connector}{path.name}"
+
+    if not path.is_dir():
+        return
+
+    # Lines ready to emit and (path, prefix, is_last) directories still to
+    # list; children are pushed in reverse so they pop in order
+    stack: list[str | tuple[str, str, bool]] = [(os.fspath(path), prefix, is_last)]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            yield node
+            continue
 
-    if path.is_dir():
+        dir_path, dir_prefix, dir_is_last = node
         # Get all visible items, sorted with directories first
         try:
-            items = sorted(
-                [p for p in path.iterdir() if not p.name.startswith(".")],
-                key=lambda p: (not p.is_dir(), p.name.lower()),
-            )
+            with os.scandir(dir_path) as entries:
+                items = sorted(
+                    (e for e in entries if not e.name.startswith(".")),
+                    key=lambda e: (not e.is_dir(), e.name.lower()),
+                )
+        except PermissionError:
+            yield f"{dir_prefix}    <Permission denied>"
+            continue
 
-            # Prepare the prefix for children
-            child_prefix = prefix + ("    " if is_last else "│   ")
+        # Prepare the prefix for children
+        child_prefix = dir_prefix + ("    " if dir_is_last else "│   ")
 
-            # Add each child
-            for i, item in enumerate(items):
-                is_last_item = i == len(items) - 1
-                lines.extend(format_directory_tree(item, child_prefix, is_last_item))
+        last_index = len(items) - 1
+        for i in range(last_index, -1, -1):
+            item = items[i]
+            item_is_last = i == last_index
+            if item.is_dir(follow_symlinks=False):
+                stack.append((item.path, child_prefix, item_is_last))
+            connector = "└── " if item_is_last else "├── "
+            stack.append(f"{child_prefix}{connector}{item.name}")
 
-        except PermissionError:
-            lines.append(f"{prefix}    <Permission denied>")
 
-    return lines
+def _find_variable_value(name: str) -> str | None:
+    """Get a persistent variable's value, tolerating loose spellings of its name.
+
+    Tries an exact match, then matches ignoring surrounding whitespace, case,
+    and finally spaces and case. Only the exact match queries by name; the
+    fallbacks scan (name, value) rows fetched at most once per request.
+
+    Args:
+        name: Variable name as written in the reference
+
+    Returns:
+        str | None: The variable's value, or None if no variable matches
+    """
+    value = (
+        PersistentVariable.query.with_entities(PersistentVariable.value)
+        .filter_by(name=name)
+        .scalar()
+    )
+    if value is not None:
+        return value
+
+    rows = g.get("_variable_rows")
+    if rows is None:
+        rows = g.setdefault(
+            "_variable_rows",
+            PersistentVariable.query.with_entities(
+                PersistentVariable.name, PersistentVariable.value
+            ).all(),
+        )
+
+    def squash(text: str) -> str:
+        return text.replace(" ", "").lower()
+
+    for normalize in (str.strip, str.lower, squash):
+        target = normalize(name)
+        for row_name, row_value in rows:
+            if normalize(row_name) == target:
+                return row_value
+    return None
 
 
 async def get_reference_content(
@@ -491,49 +730,19 @@ async def get_reference_content(
 
             file_path = Path(value)
             if file_path.is_file():
-                with open(file_path, encoding="utf-8") as file:
-                    content = file.read()
+                # Read off the event loop so concurrent lookups keep running
+                content = await asyncio.to_thread(file_path.read_text, encoding="utf-8")
                 return content, error
             return "", f"File not found: {value}"
         if reference_type == "dir":
             return f"@[dir:{value}]", error
         if reference_type in ["variable", "var"]:
             current_app.logger.info("[Reference Content] Looking up variable")
-            all_vars = PersistentVariable.query.all()
-            current_app.logger.info("[Reference Content] All variables in database")
-
-            # Try exact match first
-            variable = PersistentVariable.query.filter_by(name=value).first()
-
-            if not variable:
-                # Try with stripped whitespace
-                variable = next(
-                    (v for v in all_vars if v.name.strip() == value.strip()), error
-                )
-
-            if not variable:
-                # Try case-insensitive match
-                variable = PersistentVariable.query.filter(
-                    PersistentVariable.name.ilike(value)
-                ).first()
-
-            if not variable:
-                # Try matching with different space variations
-                cleaned_value = value.replace(" ", "").lower()
-                variable = next(
-                    (
-                        v
-                        for v in all_vars
-                        if v.name.replace(" ", "").lower() == cleaned_value
-                    ),
-                    error,
-                )
+            variable_value = _find_variable_value(value)
 
-            if variable:
-                current_app.logger.info(
-                    "[Reference Content] Found variable '{variable.name}' with value"
-                )
-                return variable.value
+            if variable_value is not None:
+                current_app.logger.info("[Reference Content] Found variable")
+                return variable_value
 
             current_app.logger.error("[Reference Content] Variable not found")
             return error
@@ -559,8 +768,8 @@ async def get_reference_content(
 
                 handler = GitHubAPIHandler(endpoint)
                 try:
-                    issue_data = await handler.get_issue_content(
-                        owner, repo, issue_number
+                    issue_data = await run_coroutine_async(
+                        handler.get_issue_content(owner, repo, issue_number)
                     )
                     if issue_data is error:
                         return (
@@ -578,6 +787,15 @@ async def get_reference_content(
         return "", str(e)
 
 
+def _lookup_result(
+    result: tuple[str, str | None] | Exception,
+) -> tuple[str, str | None]:
+    """Unpack a gathered reference lookup, re-raising the error it failed with."""
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
 async def resolve_references(content: str) -> str:
     """Helper function to resolve all references in content.
 
@@ -587,17 +805,18 @@ async def resolve_references(content: str) -> str:
     Returns:
         str: Content with resolved references
     """
-    import re
+    # Each distinct reference is looked up once, all of them concurrently
+    keys = list(dict.fromkeys(map(_ref_key, _REF_PATTERN.finditer(content))))
 
-    # Match @[type:value] format
-    ref_pattern = r"@\[(\w+):([^\]]+)\]"
-    matches = list(re.finditer(ref_pattern, content))
+    results = await asyncio.gather(
+        *(get_reference_content(ref_type, value) for ref_type, value in keys),
+        return_exceptions=True,
+    )
 
-    resolved_content = content
-    for match in matches:
+    resolved = {}
+    for key, result in zip(keys, results, strict=True):
         try:
-            ref_type = match.group(1)
-            ref_value = match.group(2).strip()
+            ref_type, ref_value = key
 
             current_app.logger.debug(
                 "Resolving reference",
@@ -608,12 +827,12 @@ async def resolve_references(content: str) -> str:
                 },
             )
 
-            ref_content, error = await get_reference_content(ref_type, ref_value)
+            ref_content, error = _lookup_result(result)
             if error:
                 msg = f"Failed to resolve reference {ref_type}:{ref_value}: {error}"
                 raise ValueError(msg)
 
-            resolved_content = resolved_content.replace(match.group(0), ref_content)
+            resolved[key] = ref_content
 
         except ValueError as e:
             current_app.logger.exception(
@@ -633,7 +852,8 @@ async def resolve_references(content: str) -> str:
             msg = f"Unexpected error resolving reference {ref_type}:{ref_value}: {e!s}"
             raise ValueError(msg)
 
-    return resolved_content
+    # One pass, so inserted content is never searched for references
+    return _REF_PATTERN.sub(lambda m: resolved[_ref_key(m)], content)
 
 
 @prompts_bp.route("/api/references/<type>", methods=["GET"])
@@ -805,12 +1025,13 @@ async def generate_prompt_response(prompt_id: int):
 
         # Format prompt
         formatted_prompt = "\n".join(
-            f"### {fence['name']} ###\n{fence['content']}" for fence in processed_fences
+            [
+                f"### {fence['name']} ###\n{fence['content']}"
+                for fence in processed_fences
+            ]
         )
 
         # Initialize LLM service
-        from src.app.services.llm_service import LLMService
-
         llm_service = LLMService()
 
         if not (token := session.get(f"{provider}_token")):
@@ -842,30 +1063,108 @@ async def generate_prompt_response(prompt_id: int):
         ), HTTPStatus.INTERNAL_SERVER_ERROR
 
 
-def _generate_stream(llm_service, provider, formatted_prompt):
-    """Generator function for streaming LLM responses."""
+def _sse_event(text: str) -> str:
+    """Format text as one SSE event, prefixing every line so none is dropped."""
+    return "".join([f"data: {line}\n" for line in text.split("\n")]) + "\n"
+
+
+def _read_stream(
+    chunks: Iterator[str], out: queue.Queue[object], stop: threading.Event
+) -> None:
+    """Move provider chunks onto a queue until the stream ends or stop is set.
+
+    The last item queued is _STREAM_END, or the exception that ended the
+    stream.
+    """
     try:
-        for chunk in llm_service.generate_stream(provider, formatted_prompt):
+        for chunk in chunks:
+            if stop.is_set():
+                return
             if chunk:
-                logger.debug("Sending chunk", extra={"chunk_size": len(chunk)})
-                yield f"data: {chunk}\n\n"
-    except Exception as e:
-        logger.exception("Error during generation")
-        yield f"data: Error: {e!s}\n\n"
+                out.put(chunk)
+    except Exception as e:  # noqa: BLE001 - handed to the consumer, which logs it
+        out.put(e)
+    else:
+        out.put(_STREAM_END)
+
+
+def _generate_stream(llm_service, provider, formatted_prompt):
+    """Generator function for streaming LLM responses.
+
+    The provider stream is read on a worker thread, so pending text is sent
+    once STREAM_FLUSH_CHARS characters have built up or STREAM_FLUSH_SECONDS
+    have passed since the last event, even while the provider is paused.
+    """
+    chunks: queue.Queue[object] = queue.Queue()
+    stop = threading.Event()
+    threading.Thread(
+        target=contextvars.copy_context().run,
+        args=(
+            _read_stream,
+            llm_service.generate_stream(provider, formatted_prompt),
+            chunks,
+            stop,
+        ),
+        name="llm-stream",
+        daemon=True,
+    ).start()
+
+    pending = []
+    pending_size = 0
+    last_flush = time.monotonic()
+    error = None
+    try:
+        while True:
+            timeout = None
+            if pending:
+                timeout = max(0.0, last_flush + STREAM_FLUSH_SECONDS - time.monotonic())
+            try:
+                item = chunks.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STREAM_END:
+                break
+            if isinstance(item, Exception):
+                error = item
+                break
+            if item is not None:
+                pending.append(item)
+                pending_size += len(item)
+            now = time.monotonic()
+            if pending and (
+                pending_size >= STREAM_FLUSH_CHARS
+                or now - last_flush >= STREAM_FLUSH_SECONDS
+            ):
+                logger.debug("Sending chunk", extra={"chunk_size": pending_size})
+                yield _sse_event("".join(pending))
+                pending.clear()
+                pending_size = 0
+                last_flush = now
     finally:
-        yield "data: [DONE]\n\n"
+        # Also reached when the client disconnects mid-stream
+        stop.set()
+
+    if pending:
+        yield _sse_event("".join(pending))
+    if error is not None:
+        logger.error("Error during generation", exc_info=error)
+        yield _sse_event(f"Error: {error!s}")
+    yield "data: [DONE]\n\n"
 
 
 async def validate_openai_token(token: str) -> bool:
     """Validate OpenAI API token."""
-    try:
-        import openai
+    if openai is None:
+        logger.error("OpenAI token validation needs the openai package")
+        return False
 
+    try:
         openai.api_key = token
         await openai.ChatCompletion.acreate(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": "test"}],
             max_tokens=1,
+            request_timeout=TOKEN_VALIDATION_TIMEOUT_SECONDS,
         )
 
     except Exception:
@@ -877,11 +1176,17 @@ async def validate_openai_token(token: str) -> bool:
 
 async def validate_anthropic_token(token: str) -> bool:
     """Validate Anthropic API token."""
-    try:
-        import anthropic
+    if anthropic is None:
+        logger.error("Anthropic token validation needs the anthropic package")
+        return False
 
-        client = anthropic.Client(api_key=token)
-        await client.messages.create(
+    try:
+        client = anthropic.Client(
+            api_key=token, timeout=TOKEN_VALIDATION_TIMEOUT_SECONDS
+        )
+        # The client is synchronous, so keep its request off the event loop
+        await asyncio.to_thread(
+            client.messages.create,
             model="claude-2",
             max_tokens=1,
             messages=[{"role": "user", "content": "test"}],
@@ -897,12 +1202,13 @@ async def validate_anthropic_token(token: str) -> bool:
 async def validate_google_token(token: str) -> bool:
     """Validate Google API token."""
     try:
-        from litellm import completion
-
-        completion(
+        # litellm's completion is synchronous, so keep it off the event loop
+        await asyncio.to_thread(
+            completion,
             model="gemini-1.5-pro",
             messages=[{"role": "user", "content": "test"}],
             api_key=token,
+            timeout=TOKEN_VALIDATION_TIMEOUT_SECONDS,
         )
     except Exception:
         logger.exception("Google token validation failed")
@@ -912,48 +1218,76 @@ async def validate_google_token(token: str) -> bool:
 
 
 def is_path_allowed(path: Path, *, is_native_picker: bool = False) -> bool:
+    """Check if a path is allowed, remembering the answer for this request.
+
+    Decisions are not shared across requests, since they depend on
+    permissions and files that can change between them.
+
+    Args:
+        path: Path to check
+        is_native_picker: Whether the file was selected through native file picker
+    """
+    key = (os.fspath(path), is_native_picker)
+    decisions = g.setdefault("_path_decisions", {})
+    if key not in decisions:
+        decisions[key] = _check_path_allowed(path, is_native_picker=is_native_picker)
+    return decisions[key]
+
+
+def _check_path_allowed(path: Path, *, is_native_picker: bool) -> bool:
     """Check if a path is allowed.
 
     Args:
         path: Path to check
         is_native_picker: Whether the file was selected through native file picker
     """
-    workspace_path = current_app.config.get(
-        "WORKSPACE_PATH", Path(__file__).resolve().parent
-    )
+    workspace_path = current_app.config.get("WORKSPACE_PATH", _DEFAULT_WORKSPACE)
     allowed_dirs = current_app.config.get("ALLOWED_DIRS", [workspace_path])
 
     current_app.logger.info(
-        "[Path Check] Checking if {path} is allowed. Is native picker: {is_native_picker}"
+        "[Path Check] Checking if %s is allowed. Is native picker: %s",
+        path,
+        is_native_picker,
     )
 
     if not is_native_picker:
         for allowed_dir in allowed_dirs:
-            allowed_path = Path(allowed_dir).resolve()
+            allowed_path = _resolve_dir(allowed_dir)
             try:
                 if path.is_relative_to(allowed_path):
                     current_app.logger.info(
-                        "[Path Check] Path {path} is relative to allowed dir {allowed_path}"
+                        "[Path Check] Path %s is relative to allowed dir %s",
+                        path,
+                        allowed_path,
                     )
                     return True
             except Exception:
                 current_app.logger.exception(
-                    "[Path Check] Error checking if {path} is relative to {allowed_path}"
+                    "[Path Check] Error checking if %s is relative to %s",
+                    path,
+                    allowed_path,
                 )
                 continue
 
-    if path.is_file():
-        has_access = os.access(str(path), os.R_OK)
+    # One stat decides the kind of path; access() then checks permissions
+    try:
+        mode = path.stat().st_mode
+    except OSError:
+        current_app.logger.info("[Path Check] Path %s does not exist", path)
+        return False
+
+    if stat.S_ISREG(mode):
+        has_access = os.access(path, os.R_OK)
         current_app.logger.info(
-            "[Path Check] File {path} has read access: {has_access}"
+            "[Path Check] File %s has read access: %s", path, has_access
         )
         return has_access
-    if path.is_dir():
-        has_access = os.access(str(path), os.R_OK | os.X_OK)
+    if stat.S_ISDIR(mode):
+        has_access = os.access(path, os.R_OK | os.X_OK)
         current_app.logger.info(
-            "[Path Check] Directory {path} has read/execute access: {has_access}"
+            "[Path Check] Directory %s has read/execute access: %s", path, has_access
         )
         return has_access
 
-    current_app.logger.info("[Path Check] File {path} has read access: {has_access}")
-    return has_access
+    current_app.logger.info("[Path Check] Path %s is not a file or directory", path)
+    return False
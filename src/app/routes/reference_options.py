@@ -8,9 +8,53 @@ from src.app.models.api_endpoint import APIEndpoint
 from src.app.models.reference_models import (
     PersistentVariable,
 )
+from src.app.utils.response_utils import etag_response, table_etag
+from src.app.utils.ttl_cache import TTLCache
 
 reference_options_bp = Blueprint("reference_options", __name__)
 
+REFERENCE_OPTIONS_TTL_SECONDS = 300.0
+
+# Option lists keyed by reference type and table ETag. Writes seen by this
+# process drop every list; the ETag in the key catches writes made elsewhere.
+_options_cache = TTLCache(REFERENCE_OPTIONS_TTL_SECONDS, max_entries=16)
+_options_cache.invalidate_on(PersistentVariable, APIEndpoint)
+
+
+def _variable_options() -> list[dict[str, str]]:
+    """Build dropdown options for persistent variables."""
+    variables = PersistentVariable.query.all()
+    if not variables:
+        return [{"value": "", "label": "No variables available"}]
+    return [
+        {
+            "value": f"@[var:{var.name}]",
+            "label": f"{var.name} - {var.description or 'No description'}",
+        }
+        for var in variables
+    ]
+
+
+def _endpoint_options() -> list[dict[str, str]]:
+    """Build dropdown options for API endpoints."""
+    endpoints = APIEndpoint.query.all()
+    if not endpoints:
+        return [{"value": "", "label": "No API endpoints available"}]
+    return [
+        {
+            "value": f"@[api:{endpoint.name}]",
+            "label": f"{endpoint.name} - {endpoint.description or 'No description'}",
+        }
+        for endpoint in endpoints
+    ]
+
+
+# Model and option builder for each supported reference type
+_OPTION_SOURCES = {
+    "var": (PersistentVariable, _variable_options),
+    "api": (APIEndpoint, _endpoint_options),
+}
+
 
 @reference_options_bp.route("/reference-options", methods=["GET"])
 def get_reference_options():
@@ -19,33 +63,23 @@ def get_reference_options():
     if not ref_type:
         return jsonify({"error": "Reference type is required"}), 400
 
+    source = _OPTION_SOURCES.get(ref_type)
+    if source is None:
+        return jsonify({"error": "Invalid reference type"}), 400
+    model, build_options = source
+
     try:
-        if ref_type == "var":
-            variables = PersistentVariable.query.all()
-            if not variables:
-                return jsonify([{"value": "", "label": "No variables available"}])
-            options = [
-                {
-                    "value": f"@[var:{var.name}]",
-                    "label": f"{var.name} - {var.description or 'No description'}",
-                }
-                for var in variables
-            ]
-        elif ref_type == "api":
-            endpoints = APIEndpoint.query.all()
-            if not endpoints:
-                return jsonify([{"value": "", "label": "No API endpoints available"}])
-            options = [
-                {
-                    "value": f"@[api:{endpoint.name}]",
-                    "label": f"{endpoint.name} - {endpoint.description or 'No description'}",
-                }
-                for endpoint in endpoints
-            ]
-        else:
-            return jsonify({"error": "Invalid reference type"}), 400
-
-        return jsonify(options)
+        etag = table_etag(model)
+
+        def build_response():
+            key = (ref_type, etag)
+            options = _options_cache.get(key)
+            if options is None:
+                options = build_options()
+                _options_cache.set(key, options)
+            return jsonify(options)
+
+        return etag_response(etag, build_response)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -2,8 +2,6 @@
 
 from __future__ import annotations
 
-import os
-
 from flask import Blueprint, request
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -14,12 +12,19 @@ from src.app.models.reference_models import (
     AllowedDirectory,
     PersistentVariable,
 )
+from src.app.utils.allowed_dirs import find_allowed_dir
 from src.app.utils.response_utils import (
+    DIRECTORY_FIELDS,
+    ENDPOINT_FIELDS,
+    VARIABLE_FIELDS,
     create_api_response,
+    etag_response,
     handle_db_error,
+    serialize_all,
     serialize_directory,
     serialize_endpoint,
     serialize_variable,
+    table_etag,
 )
 from src.app.utils.validation_utils import RequestValidator, validate_json_request
 
@@ -29,11 +34,14 @@ references_bp = Blueprint("references", __name__, url_prefix="/api/references")
 @references_bp.route("/variables", methods=["GET"])
 def list_variables():
     """List all persistent variables."""
-    variables = PersistentVariable.query.all()
-    response = APIResponseBuilder.success(
-        data=[serialize_variable(var) for var in variables]
-    )
-    return create_api_response(response)
+
+    def build_response():
+        response = APIResponseBuilder.success(
+            data=serialize_all(PersistentVariable, VARIABLE_FIELDS)
+        )
+        return create_api_response(response)
+
+    return etag_response(table_etag(PersistentVariable), build_response)
 
 
 @references_bp.route("/variables", methods=["POST"])
@@ -105,11 +113,14 @@ def delete_variable(variable_id):
 @references_bp.route("/directories", methods=["GET"])
 def list_directories():
     """List all allowed directories."""
-    directories = AllowedDirectory.query.all()
-    response = APIResponseBuilder.success(
-        data=[serialize_directory(dir) for dir in directories]
-    )
-    return create_api_response(response)
+
+    def build_response():
+        response = APIResponseBuilder.success(
+            data=serialize_all(AllowedDirectory, DIRECTORY_FIELDS)
+        )
+        return create_api_response(response)
+
+    return etag_response(table_etag(AllowedDirectory), build_response)
 
 
 @references_bp.route("/directories", methods=["POST"])
@@ -186,11 +197,14 @@ def delete_directory(directory_id):
 @references_bp.route("/endpoints", methods=["GET"])
 def list_endpoints():
     """List all API endpoints."""
-    endpoints = APIEndpoint.query.all()
-    response = APIResponseBuilder.success(
-        data=[serialize_endpoint(endpoint) for endpoint in endpoints]
-    )
-    return create_api_response(response)
+
+    def build_response():
+        response = APIResponseBuilder.success(
+            data=serialize_all(APIEndpoint, ENDPOINT_FIELDS)
+        )
+        return create_api_response(response)
+
+    return etag_response(table_etag(APIEndpoint), build_response)
 
 
 @references_bp.route("/endpoints", methods=["POST"])
@@ -285,17 +299,12 @@ def validate_path():
     if validation_error:
         return create_api_response(validation_error)
 
-    path = os.path.abspath(data["path"])
-    allowed_directories = AllowedDirectory.query.all()
-
-    for directory in allowed_directories:
-        allowed_path = os.path.abspath(directory.path)
-        if path.startswith(allowed_path):
-            if directory.is_recursive or os.path.dirname(path) == allowed_path:
-                response = APIResponseBuilder.success(
-                    data={"valid": True, "allowed_directory": directory.path}
-                )
-                return create_api_response(response)
+    allowed_dir = find_allowed_dir(data["path"])
+    if allowed_dir is not None:
+        response = APIResponseBuilder.success(
+            data={"valid": True, "allowed_directory": allowed_dir.stored_path}
+        )
+        return create_api_response(response)
 
     response = APIResponseBuilder.success(
         data={"valid": False, "message": "Path is not within any allowed directory"}
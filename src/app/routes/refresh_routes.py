@@ -15,6 +15,9 @@ from src.app.utils.exceptions import RefreshError
 logger = logging.getLogger(__name__)
 refresh_bp = Blueprint("refresh", __name__)
 
+# A whole block ID: letters, digits, underscores and hyphens only
+_BLOCK_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
 reference_service = ReferenceService()
 global_token_counter = GlobalTokenCounter()
 refresh_service = RefreshService(reference_service, global_token_counter)
@@ -28,7 +31,7 @@ async def refresh_block(block_id: str):
         block_id: ID of the block to refresh
     """
     # Validate block_id format
-    if not re.match(r"^[a-zA-Z0-9_-]+$", block_id):
+    if not _BLOCK_ID_PATTERN.fullmatch(block_id):
         return jsonify(
             {
                 "status": "error",
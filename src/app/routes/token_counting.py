@@ -2,22 +2,72 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import os
 from typing import TYPE_CHECKING
 from uuid import UUID
 
-import tiktoken
 from flask import Blueprint, current_app, jsonify, render_template, request
+from sqlalchemy import bindparam, select
 
 from src.app.models.api_endpoint import APIEndpoint
+from src.app.models.db import db
 from src.app.models.reference_models import PersistentVariable
 from src.app.services.background_processor import TaskPriority, TaskStatus
+from src.app.services.file_reference_handler import FileReferenceHandler
+from src.app.services.github_api_handler import GitHubAPIHandler
+from src.app.utils.event_loop import run_coroutine_async
+from src.app.utils.response_utils import not_modified_response
+from src.app.utils.tokenizer import get_encoding
+from src.app.utils.ttl_cache import TTLCache
 
 if TYPE_CHECKING:
     from src.app.services.task_manager import TokenCountingTaskManager
 
 token_counting_bp = Blueprint("token_counting", __name__)
 
+# Reference types count_reference_tokens can resolve
+REFERENCE_TYPES = ("api", "var", "file", "github")
+
+REFERENCE_BATCH_MAX_SIZE = 50
+
+# Longer texts are counted by the background processor instead of inline
+COUNT_TEXT_INLINE_MAX_CHARS = 50_000
+
+COUNT_TEXT_BATCH_MAX_SIZE = 100
+
+# Directories validate_path accepts, resolved against the startup directory
+_VALIDATE_PATH_DIRS = tuple(
+    os.path.abspath(name) for name in ("prompts", "tests", "examples")
+)
+_VALIDATE_PATH_PREFIXES = tuple(path + os.sep for path in _VALIDATE_PATH_DIRS)
+
+# Referenced files are read and counted this many characters at a time
+FILE_COUNT_CHUNK_SIZE = 64 * 1024
+
+REFERENCE_ROW_TTL_SECONDS = 60.0
+REFERENCE_ROW_CACHE_SIZE = 1024
+
+# Detached variables and endpoints, keyed by name; the GitHub endpoint is
+# kept under _GITHUB_ENDPOINT_KEY
+_variable_cache = TTLCache(REFERENCE_ROW_TTL_SECONDS, REFERENCE_ROW_CACHE_SIZE)
+_endpoint_cache = TTLCache(REFERENCE_ROW_TTL_SECONDS, REFERENCE_ROW_CACHE_SIZE)
+_variable_cache.invalidate_on(PersistentVariable)
+_endpoint_cache.invalidate_on(APIEndpoint)
+
+# Lookup statements are built once, so every call reuses their cache key
+_VARIABLES_BY_NAME = select(PersistentVariable).where(
+    PersistentVariable.name.in_(bindparam("names", expanding=True))
+)
+_ENDPOINTS_BY_NAME = (
+    select(APIEndpoint)
+    .where(APIEndpoint.name.in_(bindparam("names", expanding=True)))
+    .order_by(APIEndpoint.id)
+)
+_GITHUB_ENDPOINT = select(APIEndpoint).filter_by(type="github").limit(1)
+_GITHUB_ENDPOINT_KEY = ("type", "github")
+
 
 @token_counting_bp.route("/", methods=["GET"])
 def token_counter():
@@ -40,15 +90,40 @@ async def count_tokens():
 
 @token_counting_bp.route("/count_text", methods=["POST"])
 def count_text():
-    """Count tokens in text using tiktoken."""
+    """Count tokens in text using tiktoken.
+
+    Callers that send "async": true opt in to having texts longer than
+    COUNT_TEXT_INLINE_MAX_CHARS queued on the background processor, answered
+    with 202 and a task_id to poll at /status/<task_id>. Everything else,
+    including any text while the processor is not running, is counted inline.
+    """
     try:
         data = request.get_json()
         if not data or "text" not in data:
             return jsonify({"status": "error", "message": "No text provided"}), 400
 
         text = data["text"]
-        encoding = tiktoken.get_encoding("cl100k_base")
-        token_count = len(encoding.encode(text))
+        if data.get("async") is True and len(text) > COUNT_TEXT_INLINE_MAX_CHARS:
+            priority_name = data.get("priority", "MEDIUM")
+            if (
+                not isinstance(priority_name, str)
+                or priority_name not in TaskPriority.__members__
+            ):
+                return jsonify(
+                    {"status": "error", "message": f"Invalid priority: {priority_name}"}
+                ), 400
+            priority = TaskPriority[priority_name]
+
+            task_manager: TokenCountingTaskManager = current_app.token_task_manager
+            try:
+                task_id = task_manager.submit_text_count(text, priority)
+            except RuntimeError:
+                current_app.logger.warning("Background processor not running")
+            else:
+                return jsonify({"status": "pending", "task_id": str(task_id)}), 202
+
+        # Special-token text is counted as ordinary text instead of rejected
+        token_count = len(get_encoding().encode_ordinary(text))
 
         return jsonify({"status": "success", "token_count": token_count})
     except Exception as e:
@@ -56,116 +131,336 @@ def count_text():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+def _parse_reference(reference: str) -> tuple[str, str]:
+    """Split an "@[type:value]" reference into its type and value.
+
+    Raises:
+        ValueError: If the reference is malformed or of an unknown type
+    """
+    if (
+        not isinstance(reference, str)
+        or not reference.startswith("@[")
+        or not reference.endswith("]")
+        or ":" not in reference
+    ):
+        msg = "Invalid reference format"
+        raise ValueError(msg)
+
+    ref_type, ref_value = reference[2:-1].split(":", 1)
+    current_app.logger.info(
+        "Parsed reference - type: %s, value: %s", ref_type, ref_value
+    )
+
+    if ref_type not in REFERENCE_TYPES:
+        msg = f"Invalid reference type: {ref_type}"
+        raise ValueError(msg)
+    return ref_type, ref_value
+
+
+def _load_named_rows(
+    parsed: list[tuple[str, str]],
+) -> tuple[dict[str, PersistentVariable], dict[str, APIEndpoint]]:
+    """Fetch the variables and endpoints named by references.
+
+    Rows are served from a short-lived cache where possible; the rest are
+    loaded with one query per table and detached before being cached, so
+    later commits in other requests cannot expire them.
+
+    Args:
+        parsed: (type, value) pairs from _parse_reference
+
+    Returns:
+        Variables and API endpoints keyed by name
+    """
+    var_names = {value for ref_type, value in parsed if ref_type == "var"}
+    api_names = {value for ref_type, value in parsed if ref_type == "api"}
+
+    variables = {name: _variable_cache.get(name) for name in var_names}
+    missing = [name for name, variable in variables.items() if variable is None]
+    if missing:
+        for variable in db.session.scalars(_VARIABLES_BY_NAME, {"names": missing}):
+            db.session.expunge(variable)
+            _variable_cache.set(variable.name, variable)
+            variables[variable.name] = variable
+
+    endpoints = {name: _endpoint_cache.get(name) for name in api_names}
+    missing = [name for name, endpoint in endpoints.items() if endpoint is None]
+    if missing:
+        # Keep the first row per name, as filter_by(...).first() did
+        for endpoint in db.session.scalars(_ENDPOINTS_BY_NAME, {"names": missing}):
+            if endpoints[endpoint.name] is None:
+                db.session.expunge(endpoint)
+                _endpoint_cache.set(endpoint.name, endpoint)
+                endpoints[endpoint.name] = endpoint
+
+    return variables, endpoints
+
+
+def _get_github_endpoint() -> APIEndpoint | None:
+    """Get the GitHub endpoint configuration, cached for a short TTL."""
+    endpoint = _endpoint_cache.get(_GITHUB_ENDPOINT_KEY)
+    if endpoint is None:
+        endpoint = db.session.scalar(_GITHUB_ENDPOINT)
+        if endpoint is not None:
+            db.session.expunge(endpoint)
+            _endpoint_cache.set(_GITHUB_ENDPOINT_KEY, endpoint)
+    return endpoint
+
+
+async def _get_reference_content(
+    ref_type: str,
+    ref_value: str,
+    variables: dict[str, PersistentVariable],
+    endpoints: dict[str, APIEndpoint],
+) -> str:
+    """Get the content a parsed non-file reference stands for.
+
+    Args:
+        ref_type: Reference type
+        ref_value: Reference value
+        variables: Preloaded variables keyed by name
+        endpoints: Preloaded API endpoints keyed by name
+
+    Raises:
+        ValueError: If the referenced content cannot be found
+    """
+    content = None
+    if ref_type == "var":
+        current_app.logger.info("Looking up variable: %s", ref_value)
+        variable = variables.get(ref_value)
+        if not variable:
+            current_app.logger.error("Variable not found: %s", ref_value)
+            raise ValueError(f"Variable not found: {ref_value}")
+        content = variable.value
+        current_app.logger.debug("Found variable value (%d chars)", len(content))
+    elif ref_type == "api":
+        current_app.logger.info("Looking up API endpoint: %s", ref_value)
+        endpoint = endpoints.get(ref_value)
+        if not endpoint:
+            current_app.logger.error("API endpoint not found: %s", ref_value)
+            raise ValueError(f"API endpoint not found: {ref_value}")
+        content = (
+            endpoint.content
+            if endpoint.content
+            else endpoint.description or endpoint.name
+        )
+        current_app.logger.debug("Found API endpoint content (%d chars)", len(content))
+    elif ref_type == "github":
+        if ref_value.startswith("issue:"):
+            issue_ref = ref_value.split(":", 1)[1]
+            current_app.logger.info("Looking up GitHub issue: %s", issue_ref)
+
+            try:
+                if "#" not in issue_ref:
+                    raise ValueError(
+                        "Invalid GitHub issue reference format. Expected: owner/repo#issue"
+                    )
+                repo_part, issue_number = issue_ref.split("#", 1)
+                owner, repo = repo_part.split("/", 1)
+            except ValueError:
+                raise ValueError(
+                    "Invalid GitHub issue reference format. Expected: owner/repo#issue"
+                )
+
+            current_app.logger.info(
+                "Parsed GitHub reference - owner: %s, repo: %s, issue: %s",
+                owner,
+                repo,
+                issue_number,
+            )
+
+            endpoint = _get_github_endpoint()
+            if not endpoint:
+                current_app.logger.error("GitHub API endpoint not configured")
+                raise ValueError("GitHub API endpoint not configured")
+
+            handler = GitHubAPIHandler(endpoint)
+            issue_data = await run_coroutine_async(
+                handler.get_issue_content(owner, repo, issue_number)
+            )
+            if issue_data is None:
+                raise ValueError(
+                    f"GitHub issue not found: {owner}/{repo}#{issue_number}"
+                )
+
+            content = f"{issue_data.get('title', '')}\n\n{issue_data.get('body', '')}"
+        else:
+            raise ValueError(f"Invalid GitHub reference format: {ref_value}")
+
+    if content is None:
+        raise ValueError("Failed to get reference content")
+    return content
+
+
+async def _count_reference_tokens(
+    ref_type: str,
+    ref_value: str,
+    variables: dict[str, PersistentVariable],
+    endpoints: dict[str, APIEndpoint],
+) -> int:
+    """Count tokens for a parsed reference.
+
+    Files are read and counted chunk by chunk on a worker thread, so neither
+    the whole file nor the event loop is held while counting.
+
+    Raises:
+        ValueError: If the referenced content cannot be found
+    """
+    token_service = current_app.token_service
+    if ref_type == "file":
+        if not os.path.exists(ref_value):
+            raise ValueError(f"File not found: {ref_value}")
+        chunks = FileReferenceHandler().iter_file(ref_value, FILE_COUNT_CHUNK_SIZE)
+        token_count = await asyncio.to_thread(token_service.count_tokens_stream, chunks)
+        current_app.logger.info("Counted file content from: %s", ref_value)
+        return token_count
+
+    content = await _get_reference_content(ref_type, ref_value, variables, endpoints)
+    token_count, _ = await token_service.count_tokens(content)
+    return token_count
+
+
+@token_counting_bp.route("/count_text_batch", methods=["POST"])
+def count_text_batch():
+    """Count tokens in several texts with one batched tiktoken call.
+
+    The body is {"texts": [...]}; tiktoken encodes the batch on its own
+    thread pool, releasing the GIL, and the counts come back in order.
+    """
+    try:
+        data = request.get_json(silent=True)
+        texts = data.get("texts") if isinstance(data, dict) else None
+        if (
+            not isinstance(texts, list)
+            or not texts
+            or not all(isinstance(text, str) for text in texts)
+        ):
+            return jsonify(
+                {"status": "error", "message": "Expected a non-empty list of texts"}
+            ), 400
+        if len(texts) > COUNT_TEXT_BATCH_MAX_SIZE:
+            return jsonify(
+                {
+                    "status": "error",
+                    "message": f"At most {COUNT_TEXT_BATCH_MAX_SIZE} texts per batch",
+                }
+            ), 400
+
+        token_lists = get_encoding().encode_ordinary_batch(texts)
+        return jsonify(
+            {
+                "status": "success",
+                "token_counts": [len(tokens) for tokens in token_lists],
+            }
+        )
+    except Exception as e:
+        current_app.logger.exception("Error counting tokens")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
 @token_counting_bp.route("/tokens/reference-count", methods=["POST"])
 async def count_reference_tokens():
     """Count tokens for a specific reference."""
     data = request.get_json()
     reference = data.get("reference", "")
-    current_app.logger.info(f"Received reference count request for: {reference}")
+    current_app.logger.info("Received reference count request for: %s", reference)
 
     try:
-        if (
-            not reference
-            or not reference.startswith("@[")
-            or not reference.endswith("]")
-        ):
+        if not reference:
             raise ValueError("Invalid reference format")
 
-        ref_content = reference[2:-1]
-        ref_type, ref_value = ref_content.split(":", 1)
+        ref_type, ref_value = _parse_reference(reference)
+        variables, endpoints = _load_named_rows([(ref_type, ref_value)])
+        token_count = await _count_reference_tokens(
+            ref_type, ref_value, variables, endpoints
+        )
         current_app.logger.info(
-            f"Parsed reference - type: {ref_type}, value: {ref_value}"
+            "Token count for %s content: %d", reference, token_count
         )
 
-        if ref_type not in ["api", "var", "file", "github"]:
-            raise ValueError(f"Invalid reference type: {ref_type}")
-
-        content = None
-        if ref_type == "var":
-            current_app.logger.info(f"Looking up variable: {ref_value}")
-            variable = PersistentVariable.query.filter_by(name=ref_value).first()
-            if not variable:
-                current_app.logger.error(f"Variable not found: {ref_value}")
-                raise ValueError(f"Variable not found: {ref_value}")
-            content = variable.value
-            current_app.logger.info(f"Found variable value: {content}")
-        elif ref_type == "api":
-            current_app.logger.info(f"Looking up API endpoint: {ref_value}")
-            endpoint = APIEndpoint.query.filter_by(name=ref_value).first()
-            if not endpoint:
-                current_app.logger.error(f"API endpoint not found: {ref_value}")
-                raise ValueError(f"API endpoint not found: {ref_value}")
-            content = (
-                endpoint.content
-                if endpoint.content
-                else endpoint.description or endpoint.name
-            )
-            current_app.logger.info(f"Found API endpoint content: {content}")
-        elif ref_type == "file":
-            file_path = ref_value
-            if not os.path.exists(file_path):
-                raise ValueError(f"File not found: {file_path}")
-            with open(file_path, encoding="utf-8") as f:
-                content = f.read()
-            current_app.logger.info(f"Read file content from: {file_path}")
-        elif ref_type == "github":
-            if ref_value.startswith("issue:"):
-                issue_ref = ref_value.split(":", 1)[1]
-                current_app.logger.info(f"Looking up GitHub issue: {issue_ref}")
-
-                try:
-                    if "#" not in issue_ref:
-                        raise ValueError(
-                            "Invalid GitHub issue reference format. Expected: owner/repo#issue"
-                        )
-                    repo_part, issue_number = issue_ref.split("#", 1)
-                    owner, repo = repo_part.split("/", 1)
-                except ValueError:
-                    raise ValueError(
-                        "Invalid GitHub issue reference format. Expected: owner/repo#issue"
-                    )
-
-                current_app.logger.info(
-                    f"Parsed GitHub reference - owner: {owner}, repo: {repo}, issue: {issue_number}"
-                )
+        return jsonify(
+            {"status": "success", "token_count": token_count, "reference": reference}
+        )
+    except ValueError as e:
+        current_app.logger.error("ValueError in reference counting: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        current_app.logger.error("Unexpected error in reference counting: %s", e)
+        return jsonify(
+            {"status": "error", "message": f"Failed to count tokens: {e!s}"}
+        ), 500
 
-                endpoint = APIEndpoint.query.filter_by(type="github").first()
-                if not endpoint:
-                    current_app.logger.error("GitHub API endpoint not configured")
-                    raise ValueError("GitHub API endpoint not configured")
 
-                handler = GitHubAPIHandler(endpoint)
-                issue_data = await handler.get_issue_content(owner, repo, issue_number)
-                if issue_data is None:
-                    raise ValueError(
-                        f"GitHub issue not found: {owner}/{repo}#{issue_number}"
-                    )
+@token_counting_bp.route("/tokens/reference-count-batch", methods=["POST"])
+async def count_reference_tokens_batch():
+    """Count tokens for several references in one request.
 
-                content = (
-                    f"{issue_data.get('title', '')}\n\n{issue_data.get('body', '')}"
-                )
-            else:
-                raise ValueError(f"Invalid GitHub reference format: {ref_value}")
+    The body is {"references": [...]}. Variables and API endpoints are
+    loaded with one query per table and GitHub issues are fetched
+    concurrently. The response lists one entry per reference, in order,
+    shaped like the single-reference response.
+    """
+    data = request.get_json(silent=True)
+    references = data.get("references") if isinstance(data, dict) else None
+    if not isinstance(references, list) or not references:
+        return jsonify(
+            {"status": "error", "message": "Expected a non-empty references list"}
+        ), 400
+    if len(references) > REFERENCE_BATCH_MAX_SIZE:
+        return jsonify(
+            {
+                "status": "error",
+                "message": f"At most {REFERENCE_BATCH_MAX_SIZE} references per batch",
+            }
+        ), 400
 
-        if content is None:
-            raise ValueError("Failed to get reference content")
+    try:
+        parsed: list[tuple[str, str] | ValueError] = []
+        for reference in references:
+            try:
+                parsed.append(_parse_reference(reference))
+            except ValueError as e:
+                parsed.append(e)
+
+        variables, endpoints = _load_named_rows(
+            [ref for ref in parsed if not isinstance(ref, ValueError)]
+        )
 
-        token_service = current_app.token_service
-        token_count, _ = await token_service.count_tokens(content)
-        current_app.logger.info(f"Token count for {reference} content: {token_count}")
+        async def count_one(ref: tuple[str, str] | ValueError) -> int:
+            if isinstance(ref, ValueError):
+                raise ref
+            return await _count_reference_tokens(*ref, variables, endpoints)
 
-        return jsonify(
-            {"status": "success", "token_count": token_count, "reference": reference}
+        counts = await asyncio.gather(
+            *(count_one(ref) for ref in parsed), return_exceptions=True
         )
-    except ValueError as e:
-        current_app.logger.error(f"ValueError in reference counting: {e!s}")
-        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
-        current_app.logger.error(f"Unexpected error in reference counting: {e!s}")
+        current_app.logger.exception("Unexpected error in batch reference counting")
         return jsonify(
             {"status": "error", "message": f"Failed to count tokens: {e!s}"}
         ), 500
 
+    results = []
+    for reference, count in zip(references, counts, strict=True):
+        if isinstance(count, ValueError):
+            results.append(
+                {"status": "error", "message": str(count), "reference": reference}
+            )
+        elif isinstance(count, Exception):
+            results.append(
+                {
+                    "status": "error",
+                    "message": f"Failed to count tokens: {count!s}",
+                    "reference": reference,
+                }
+            )
+        else:
+            results.append(
+                {"status": "success", "token_count": count, "reference": reference}
+            )
+
+    return jsonify({"status": "success", "results": results})
+
 
 @token_counting_bp.route("/status/<task_id>", methods=["GET"])
 def get_task_status(task_id: str):
@@ -176,6 +471,15 @@ def get_task_status(task_id: str):
     if not task:
         return jsonify({"error": "Task not found"}), 404
 
+    # A completed task never changes again, so pollers can revalidate it
+    etag = None
+    if task.status == TaskStatus.COMPLETED:
+        fingerprint = f"{task.id}:{task.completed_at.isoformat()}"
+        etag = hashlib.blake2b(fingerprint.encode(), digest_size=8).hexdigest()
+        not_modified = not_modified_response(etag)
+        if not_modified is not None:
+            return not_modified
+
     response = {
         "status": task.status.value,
         "created_at": task.created_at.isoformat(),
@@ -188,7 +492,12 @@ def get_task_status(task_id: str):
     elif task.status == TaskStatus.FAILED:
         response["error"] = str(task.error)
 
-    return jsonify(response)
+    http_response = jsonify(response)
+    if etag is None:
+        http_response.headers["Cache-Control"] = "no-cache"
+    else:
+        http_response.set_etag(etag)
+    return http_response
 
 
 @token_counting_bp.route("/api/validate_path", methods=["POST"])
@@ -200,17 +509,15 @@ def validate_path():
 
         path = data["path"]
 
-        allowed_dirs = [
-            os.path.abspath("prompts"),
-            os.path.abspath("tests"),
-            os.path.abspath("examples"),
-        ]
-
         abs_path = os.path.abspath(path)
 
+        # The prefix test rejects most paths cheaply; commonpath confirms
         is_valid = any(
-            os.path.commonpath([abs_path, allowed_dir]) == allowed_dir
-            for allowed_dir in allowed_dirs
+            (abs_path == allowed_dir or abs_path.startswith(prefix))
+            and os.path.commonpath([abs_path, allowed_dir]) == allowed_dir
+            for allowed_dir, prefix in zip(
+                _VALIDATE_PATH_DIRS, _VALIDATE_PATH_PREFIXES, strict=True
+            )
         )
 
         return jsonify(
@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import asyncio
 import logging
 import uuid
 from functools import wraps
@@ -13,6 +12,7 @@ from src.app.services.error_notification import ErrorNotificationService, ErrorS
 from src.app.services.global_token_counter import (
     GlobalTokenCounter,
 )
+from src.app.utils.event_loop import run_coroutine
 
 logger = logging.getLogger(__name__)
 
@@ -22,24 +22,15 @@ error_service = ErrorNotificationService()
 
 
 def async_route(f):
-    """Decorator to handle async routes."""
+    """Decorator to run async routes on the shared background event loop."""
 
     @wraps(f)
     def wrapper(*args, **kwargs):
         try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-        async def coro():
-            try:
-                return await f(*args, **kwargs)
-            except Exception as e:
-                logger.exception("Error in async route")
-                return jsonify({"error": str(e)}), 500
-
-        return loop.run_until_complete(coro())
+            return run_coroutine(f(*args, **kwargs))
+        except Exception as e:
+            logger.exception("Error in async route")
+            return jsonify({"error": str(e)}), 500
 
     return wrapper
 
@@ -126,10 +117,12 @@ async def update_token_status():
             raise ValueError("token_count must be a non-negative number")
 
         block_tokens = session.get("block_tokens", {})
+        previous = block_tokens.get(block_id, 0)
         block_tokens[block_id] = token_count
         session["block_tokens"] = block_tokens
 
-        total_tokens = sum(block_tokens.values())
+        # Adjust the running total by this block's change instead of resumming
+        total_tokens = session.get("total_tokens", 0) + token_count - previous
         session["total_tokens"] = total_tokens
 
         return jsonify(
@@ -198,13 +191,10 @@ async def remove_block():
             raise ValueError("Invalid or missing block_id")
 
         block_tokens = session.get("block_tokens", {})
-
-        if block_id in block_tokens:
-            del block_tokens[block_id]
-
+        removed = block_tokens.pop(block_id, 0)
         session["block_tokens"] = block_tokens
 
-        total_tokens = sum(block_tokens.values())
+        total_tokens = session.get("total_tokens", 0) - removed
         session["total_tokens"] = total_tokens
 
         return jsonify(
@@ -252,13 +242,15 @@ async def batch_update_token_status():
             block_id: int(token_count) for block_id, token_count in updates.items()
         }
 
+        # Adjust the running total by the updated blocks' changes only
         block_tokens = session.get("block_tokens", {})
+        delta = 0
         for block_id, token_count in validated_updates.items():
+            delta += token_count - block_tokens.get(block_id, 0)
             block_tokens[block_id] = token_count
         session["block_tokens"] = block_tokens
 
-        # Recalculate total tokens
-        total_tokens = sum(block_tokens.values())
+        total_tokens = session.get("total_tokens", 0) + delta
         session["total_tokens"] = total_tokens
 
         return jsonify(
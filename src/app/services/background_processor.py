@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import asyncio
+import itertools
 import logging
 from collections.abc import Callable
 from dataclasses import dataclass
@@ -66,7 +67,10 @@ class BackgroundProcessor:
         self.tasks: dict[UUID, Task] = {}
         self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
         self.workers: list[asyncio.Task] = []
+        self.loop: asyncio.AbstractEventLoop | None = None
         self._running = False
+        # Breaks priority ties in submission order; tasks are not comparable
+        self._sequence = itertools.count()
 
     async def start(self):
         """Start the background processor."""
@@ -74,6 +78,7 @@ class BackgroundProcessor:
             return
 
         self._running = True
+        self.loop = asyncio.get_running_loop()
         self.workers = [
             asyncio.create_task(self._worker()) for _ in range(self.max_workers)
         ]
@@ -114,9 +119,41 @@ class BackgroundProcessor:
             status=TaskStatus.PENDING,
         )
         self.tasks[task_id] = task
-        await self.queue.put((priority.value, task))
+        await self.queue.put((priority.value, next(self._sequence), task))
         return task_id
 
+    def submit_threadsafe(
+        self,
+        func: Callable,
+        *args,
+        priority: TaskPriority = TaskPriority.MEDIUM,
+        **kwargs,
+    ) -> UUID:
+        """Submit a task from a thread other than the processor's loop.
+
+        The queue belongs to the loop the processor was started on, so the
+        submission is scheduled there and this call blocks until it is queued.
+
+        Args:
+            func: Function to execute
+            *args: Positional arguments for func
+            priority: Task priority level
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Task ID
+
+        Raises:
+            RuntimeError: If the processor has not been started
+        """
+        if self.loop is None or not self._running:
+            msg = "Background processor is not running"
+            raise RuntimeError(msg)
+        future = asyncio.run_coroutine_threadsafe(
+            self.submit(func, *args, priority=priority, **kwargs), self.loop
+        )
+        return future.result()
+
     def get_task(self, task_id: UUID) -> Task | None:
         """Get task by ID.
 
@@ -156,7 +193,7 @@ class BackgroundProcessor:
         """Worker coroutine for processing tasks."""
         while self._running:
             try:
-                _, task = await self.queue.get()
+                _, _, task = await self.queue.get()
                 task.status = TaskStatus.RUNNING
                 task.started_at = datetime.utcnow()
 
@@ -5,6 +5,8 @@ from __future__ import annotations
 import fnmatch
 from pathlib import Path
 
+from sqlalchemy import select
+
 from src.app import db
 from src.app.models.reference_models import AllowedDirectory
 
@@ -110,7 +112,10 @@ class FilePathValidator:
                 return False, f"Directory has more than {MAX_SUBDIR_FILES} files", None
 
             # Get allowed directories
-            allowed_dirs = db.session.query(AllowedDirectory).all()
+            # Only two columns are needed, so skip hydrating ORM instances
+            allowed_dirs = db.session.execute(
+                select(AllowedDirectory.path, AllowedDirectory.is_recursive)
+            ).all()
             print(f"[DEBUG] Found {len(allowed_dirs)} allowed directories")
 
             if not allowed_dirs:
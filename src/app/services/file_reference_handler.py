@@ -2,9 +2,12 @@
 
 from __future__ import annotations
 
+import codecs
 import logging
 import os
 from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, TextIO
 
 from src.app.models.reference_models import ReferenceType
 from src.app.services.file_path_validator import FilePathValidator
@@ -13,6 +16,9 @@ from src.app.services.reference_handlers import (
     ReferenceResolutionResult,
 )
 
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
 logger = logging.getLogger(__name__)
 
 
@@ -104,3 +110,52 @@ class FileReferenceHandler(ReferenceHandler):
         except UnicodeDecodeError:
             with open(file_path, encoding="latin-1") as f:
                 return f.read()
+
+    def iter_file(self, file_path: str, chunk_size: int = 64 * 1024) -> Iterator[str]:
+        """
+        Read a file lazily in chunks of roughly chunk_size characters.
+
+        The encoding is chosen like read_file, but from the first chunk only:
+        UTF-8 if it decodes, latin-1 otherwise. Invalid UTF-8 further in is
+        replaced instead of restarting the read. Chunks end on line breaks
+        unless a single line is longer than chunk_size.
+
+        Args:
+            file_path: Path to the file to read
+            chunk_size: Target chunk size in characters
+
+        Returns:
+            Iterator[str]: The file contents, chunk by chunk
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+            IOError: If there is an error opening the file
+        """
+        path = Path(file_path)
+        with path.open("rb") as f:
+            sample = f.read(chunk_size)
+        try:
+            codecs.getincrementaldecoder("utf-8")().decode(sample)
+            encoding = "utf-8"
+        except UnicodeDecodeError:
+            encoding = "latin-1"
+
+        # Opened here rather than in the generator so open errors raise now
+        file = path.open(encoding=encoding, errors="replace")
+        return self._iter_chunks(file, chunk_size)
+
+    @staticmethod
+    def _iter_chunks(file: TextIO, chunk_size: int) -> Iterator[str]:
+        """Yield line-aligned chunks from an open file, closing it when done."""
+        with file:
+            buffer: list[str] = []
+            size = 0
+            while line := file.readline(chunk_size):
+                buffer.append(line)
+                size += len(line)
+                if size >= chunk_size:
+                    yield "".join(buffer)
+                    buffer = []
+                    size = 0
+            if buffer:
+                yield "".join(buffer)
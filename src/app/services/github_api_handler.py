@@ -5,13 +5,18 @@ from __future__ import annotations
 import base64
 import json
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import httpx
 from flask import session
 
 from src.app import db
+from src.app.utils.event_loop import in_background_loop
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -23,6 +28,29 @@ from src.app.models.reference_models import ReferenceType
 from src.app.services.api_handler import APIHandler
 from src.app.services.reference_handlers import ReferenceResolutionResult
 
+# Pooled client for the background event loop. httpx connections are bound to
+# the loop that opened them, so only that long-lived loop can keep a pool;
+# reusing it skips a TLS handshake per request.
+_pooled_client: httpx.AsyncClient | None = None
+
+
+@asynccontextmanager
+async def _client() -> AsyncIterator[httpx.AsyncClient]:
+    """Get an HTTP client for the running event loop.
+
+    On the background loop this is the shared pooled client. Any other loop,
+    such as the per-request loop of an async view, gets a client that is
+    closed on exit so its connections do not outlive the loop.
+    """
+    global _pooled_client  # noqa: PLW0603
+    if not in_background_loop():
+        async with httpx.AsyncClient() as client:
+            yield client
+        return
+    if _pooled_client is None or _pooled_client.is_closed:
+        _pooled_client = httpx.AsyncClient()
+    yield _pooled_client
+
 
 class GitHubAPIHandler(APIHandler):
     """Handler for GitHub API references."""
@@ -49,24 +77,24 @@ class GitHubAPIHandler(APIHandler):
 
     async def _make_request(self, method, endpoint, **kwargs):
         """Make a request to the GitHub API."""
-        async with httpx.AsyncClient() as client:
-            # Construct API URL
-            api_url = f"https://api.github.com{endpoint}"
-            logger.debug(f"Making GitHub API request to: {api_url}")
+        # Construct API URL
+        api_url = f"https://api.github.com{endpoint}"
+        logger.debug(f"Making GitHub API request to: {api_url}")
 
+        async with _client() as client:
             response = await client.request(
                 method, api_url, headers=self.headers, **kwargs
             )
 
-            logger.debug(f"GitHub API response status: {response.status_code}")
-            if response.status_code >= 400:
-                error_data = response.json()
-                logger.error(f"GitHub API error: {json.dumps(error_data)}")
-                raise ValueError(
-                    f"GitHub API error ({response.status_code}): {json.dumps(error_data)}"
-                )
+        logger.debug(f"GitHub API response status: {response.status_code}")
+        if response.status_code >= 400:
+            error_data = response.json()
+            logger.error(f"GitHub API error: {json.dumps(error_data)}")
+            raise ValueError(
+                f"GitHub API error ({response.status_code}): {json.dumps(error_data)}"
+            )
 
-            return response.json()
+        return response.json()
 
     @property
     def reference_type(self) -> ReferenceType:
@@ -185,11 +213,9 @@ class GitHubAPIHandler(APIHandler):
                 return ReferenceResolutionResult(success=False, error=error)
 
             url, params = self._build_api_url(reference_value)
-            print(
-                f"Requesting URL: {url}" + (f" with params: {params}" if params else "")
-            )
+            logger.debug("Requesting URL: %s with params: %s", url, params)
 
-            async with httpx.AsyncClient() as client:
+            async with _client() as client:
                 if params:
                     response = await client.get(
                         url, params=params, headers=self.headers, timeout=10
@@ -197,26 +223,22 @@ class GitHubAPIHandler(APIHandler):
                 else:
                     response = await client.get(url, headers=self.headers, timeout=10)
 
-                print(f"Response status code: {response.status_code}")
+            logger.debug("Response status code: %s", response.status_code)
 
-                if response.status_code == 200:
-                    parsed_response = await self.parse_response(response)
-                    return ReferenceResolutionResult(
-                        success=True, value=parsed_response
-                    )
-                error_data = response.json()
-                error_message = error_data.get("message", "Unknown error")
-                documentation_url = error_data.get("documentation_url", "")
-                full_error = (
-                    f"GitHub API error ({response.status_code}): {error_message}"
-                )
-                if documentation_url:
-                    full_error += f"\nFor more information, see: {documentation_url}"
-                print(f"Error response: {error_data}")
-                return ReferenceResolutionResult(success=False, error=full_error)
+            if response.status_code == 200:
+                parsed_response = await self.parse_response(response)
+                return ReferenceResolutionResult(success=True, value=parsed_response)
+            error_data = response.json()
+            error_message = error_data.get("message", "Unknown error")
+            documentation_url = error_data.get("documentation_url", "")
+            full_error = f"GitHub API error ({response.status_code}): {error_message}"
+            if documentation_url:
+                full_error += f"\nFor more information, see: {documentation_url}"
+            logger.error("GitHub API error response: %s", error_data)
+            return ReferenceResolutionResult(success=False, error=full_error)
 
         except Exception as e:
-            print(f"Exception occurred: {e!s}")
+            logger.exception("Error resolving GitHub reference")
             return ReferenceResolutionResult(
                 success=False, error=f"Error processing request: {e!s}"
             )
@@ -237,23 +259,22 @@ class GitHubAPIHandler(APIHandler):
         }
 
         try:
-            async with httpx.AsyncClient() as client:
+            async with _client() as client:
                 response = await client.get(
                     "https://api.github.com/user", headers=headers, timeout=10.0
                 )
-
-                if response.status_code == 200:
-                    return True, None
-                if response.status_code == 401:
-                    return False, "Invalid GitHub token"
-                return False, f"GitHub API error: {response.status_code}"
-
         except httpx.TimeoutException:
             return False, "GitHub API request timed out"
         except Exception as e:
             logger.error(f"Error validating GitHub token: {e!s}")
             return False, f"Error validating token: {e!s}"
 
+        if response.status_code == 200:
+            return True, None
+        if response.status_code == 401:
+            return False, "Invalid GitHub token"
+        return False, f"GitHub API error: {response.status_code}"
+
     def _get_headers(self) -> dict[str, str]:
         """Get headers for GitHub API requests.
 
@@ -290,44 +311,42 @@ class GitHubAPIHandler(APIHandler):
 
         try:
             logger.debug(f"Making GitHub API request to: {url}")
-            async with httpx.AsyncClient() as client:
+            async with _client() as client:
                 response = await client.get(
                     url, headers=headers, params=params, timeout=10.0
                 )
 
-                # Log response status
-                logger.debug(f"GitHub API response status: {response.status_code}")
+            # Log response status
+            logger.debug(f"GitHub API response status: {response.status_code}")
 
-                try:
-                    response.raise_for_status()
-                except httpx.HTTPStatusError as e:
-                    logger.error(f"GitHub API error: {e.response.text}")
-                    raise ValueError(
-                        f"GitHub API error ({e.response.status_code}): {e.response.text}"
-                    )
+            try:
+                response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                logger.error(f"GitHub API error: {e.response.text}")
+                raise ValueError(
+                    f"GitHub API error ({e.response.status_code}): {e.response.text}"
+                )
 
-                try:
-                    data = response.json()
-                except ValueError:
-                    logger.error(
-                        f"Invalid JSON response from GitHub API: {response.text[:200]}"
-                    )
-                    raise ValueError("Invalid JSON response from GitHub API")
-
-                # Update token last used time
-                if self.token:
-                    token = APIToken.query.filter_by(
-                        service="github", is_active=True, is_valid=True
-                    ).first()
-                    if token:
-                        token.last_used = datetime.utcnow()
-                        try:
-                            db.session.commit()
-                        except Exception as e:
-                            logger.error(f"Error updating token last_used: {e!s}")
-                            db.session.rollback()
-
-                return data
+            try:
+                data = response.json()
+            except ValueError:
+                logger.error(
+                    f"Invalid JSON response from GitHub API: {response.text[:200]}"
+                )
+                raise ValueError("Invalid JSON response from GitHub API")
+
+            # Update token last used time
+            if self.token:
+                token = APIToken.query.filter_by(
+                    service="github", is_active=True, is_valid=True
+                ).first()
+                if token:
+                    token.last_used = datetime.utcnow()
+                    try:
+                        db.session.commit()
+                    except Exception as e:
+                        logger.error(f"Error updating token last_used: {e!s}")
+                        db.session.rollback()
 
         except httpx.TimeoutException:
             logger.error(f"GitHub API request timed out: {url}")
@@ -339,6 +358,8 @@ class GitHubAPIHandler(APIHandler):
             logger.error(f"Unexpected error in GitHub API request: {e!s}")
             raise ValueError(f"Error processing GitHub API request: {e!s}")
 
+        return data
+
     async def get_repository_issues(self, owner: str, repo: str) -> list:
         """Get issues from a GitHub repository.
 
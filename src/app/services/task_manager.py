@@ -2,10 +2,13 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 from typing import Any
 from uuid import UUID
 
+from src.app.utils.tokenizer import get_encoding
+
 from ..handlers.handler_factory import ReferenceHandlerFactory
 from ..utils.exceptions import TaskError
 from .background_processor import BackgroundProcessor, TaskPriority, TaskStatus
@@ -52,6 +55,27 @@ class TokenCountingTaskManager:
             priority=priority,
         )
 
+    def submit_text_count(
+        self,
+        text: str,
+        priority: TaskPriority = TaskPriority.MEDIUM,
+    ) -> UUID:
+        """Submit a token count for plain text from any thread.
+
+        Args:
+            text: Text to count tokens in
+            priority: Task priority level
+
+        Returns:
+            Task ID
+
+        Raises:
+            RuntimeError: If the background processor is not running
+        """
+        return self.processor.submit_threadsafe(
+            self._count_text, text, priority=priority
+        )
+
     async def get_task_status(self, task_id: UUID) -> dict[str, Any]:
         """Get status of a token counting task.
 
@@ -84,6 +108,18 @@ class TokenCountingTaskManager:
 
         return status
 
+    async def _count_text(self, text: str) -> dict[str, int]:
+        """Count tokens in text on a worker thread, keeping the loop free.
+
+        Args:
+            text: Text to count tokens in
+
+        Returns:
+            Dictionary with the token count
+        """
+        tokens = await asyncio.to_thread(get_encoding().encode_ordinary, text)
+        return {"token_count": len(tokens)}
+
     async def _count_tokens_batch(
         self,
         references: list[dict[str, Any]],
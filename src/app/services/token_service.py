@@ -3,12 +3,15 @@
 from __future__ import annotations
 
 import logging
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from litellm import token_counter
 
 from src.app.utils.exceptions import TokenizationError
 
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
 logger = logging.getLogger(__name__)
 
 
@@ -35,6 +38,21 @@ class TokenCountingService:
             msg = f"Failed to count tokens: {e!s}"
             raise TokenizationError(msg)
 
+    def count_chunk_tokens(self, chunk: str) -> int:
+        """Count tokens in one chunk of a larger text.
+
+        Summing chunk counts approximates the count for the whole text; tokens
+        that would merge across a chunk boundary are counted separately.
+        """
+        return self._count_tokens(chunk) if chunk else 0
+
+    def count_tokens_stream(self, chunks: Iterable[str]) -> int:
+        """Count tokens in a text given as chunks, holding one at a time.
+
+        Blocking; run it off the event loop when chunks come from disk.
+        """
+        return sum(self.count_chunk_tokens(chunk) for chunk in chunks)
+
     def _count_tokens(self, content: str) -> int:
         """Count tokens in content without caching."""
         try:
@@ -0,0 +1,113 @@
+"""Cached allow-list of the directories file routes may access."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import NamedTuple
+
+from sqlalchemy import select
+
+from src.app.extensions import db
+from src.app.models.reference_models import AllowedDirectory
+from src.app.utils.ttl_cache import TTLCache
+
+ALLOWED_DIRS_TTL_SECONDS = 30.0
+
+
+class AllowedDir(NamedTuple):
+    """An allowed directory, with its path normalized for comparisons."""
+
+    path: str
+    is_recursive: bool
+    stored_path: str
+
+
+_allowed_dirs_cache = TTLCache(ALLOWED_DIRS_TTL_SECONDS)
+_allowed_dirs_cache.invalidate_on(AllowedDirectory)
+
+
+def normalize_path(path: str | os.PathLike[str]) -> str:
+    """Normalize a path the way every allow-list check compares it.
+
+    Args:
+        path: Path to normalize
+
+    Returns:
+        str: The absolute path with symlinks resolved, case-normalized
+    """
+    return os.path.normcase(str(Path(path).resolve()))
+
+
+def is_within(path: str, directory: str) -> bool:
+    """Check whether a normalized path is the directory or lies below it."""
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+def get_allowed_dirs() -> tuple[AllowedDir, ...]:
+    """Get every allowed directory, cached briefly.
+
+    Returns:
+        tuple[AllowedDir, ...]: The allowed directories
+    """
+    entries = _allowed_dirs_cache.get("entries")
+    if entries is None:
+        rows = db.session.execute(
+            select(AllowedDirectory.path, AllowedDirectory.is_recursive)
+        ).all()
+        entries = tuple(
+            AllowedDir(normalize_path(path), bool(is_recursive), path)
+            for path, is_recursive in rows
+        )
+        _allowed_dirs_cache.set("entries", entries)
+    return entries
+
+
+def find_allowed_dir(path: str | os.PathLike[str]) -> AllowedDir | None:
+    """Find the allowed directory that grants access to a path.
+
+    Args:
+        path: Path to check
+
+    Returns:
+        AllowedDir | None: The granting directory, or None if the path is not
+        allowed
+    """
+    return _match_allowed_dir(normalize_path(path))
+
+
+def find_allowed_dir_resolved(path: str | os.PathLike[str]) -> AllowedDir | None:
+    """Find the allowed directory for a path whose symlinks are already resolved.
+
+    For callers that have run ``os.path.realpath`` themselves; only the case is
+    normalized, so the filesystem is not walked a second time.
+
+    Args:
+        path: Absolute path with symlinks resolved
+
+    Returns:
+        AllowedDir | None: The granting directory, or None if the path is not
+        allowed
+    """
+    return _match_allowed_dir(os.path.normcase(os.fspath(path)))
+
+
+def _match_allowed_dir(normalized: str) -> AllowedDir | None:
+    """Match a normalized path against the allowed directories.
+
+    Recursive directories allow anything below them; the others only allow
+    their direct children.
+    """
+    parent = str(Path(normalized).parent)
+    for entry in get_allowed_dirs():
+        if entry.is_recursive:
+            if is_within(normalized, entry.path):
+                return entry
+        elif parent == entry.path:
+            return entry
+    return None
+
+
+def invalidate_allowed_dirs() -> None:
+    """Drop the cached allow-list so the next check reloads it."""
+    _allowed_dirs_cache.invalidate()
@@ -0,0 +1,122 @@
+"""Shared background event loop for running coroutines from sync Flask views."""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import concurrent.futures
+import contextvars
+import threading
+from typing import TYPE_CHECKING, Any, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Coroutine
+
+T = TypeVar("T")
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """Get the process-wide event loop, starting its thread on first use.
+
+    Returns:
+        The running background event loop
+    """
+    global _loop  # noqa: PLW0603
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="background-event-loop", daemon=True
+            ).start()
+            atexit.register(_loop.call_soon_threadsafe, _loop.stop)
+    return _loop
+
+
+def in_background_loop() -> bool:
+    """Check whether the caller is running on the background loop.
+
+    Returns:
+        True if the running event loop is the background loop
+    """
+    try:
+        return _loop is not None and asyncio.get_running_loop() is _loop
+    except RuntimeError:
+        return False
+
+
+def _submit(coro: Coroutine[Any, Any, T]) -> concurrent.futures.Future[T]:
+    """Schedule a coroutine on the background loop in the caller's context."""
+    loop = get_background_loop()
+    context = contextvars.copy_context()
+    future: concurrent.futures.Future[T] = concurrent.futures.Future()
+
+    def on_done(task: asyncio.Task[T]) -> None:
+        if future.cancelled():
+            return
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+
+    def start() -> None:
+        # Tasks copy the context that is current when they are created.
+        task = context.run(loop.create_task, coro)
+        task.add_done_callback(on_done)
+        # A caller that gives up cancels the future; stop the task with it
+        future.add_done_callback(
+            lambda f: f.cancelled() and loop.call_soon_threadsafe(task.cancel)
+        )
+
+    loop.call_soon_threadsafe(start)
+    return future
+
+
+def run_coroutine(coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+    """Run a coroutine on the background loop and block until it finishes.
+
+    The caller's context variables are carried into the task, so Flask's
+    ``current_app``, ``request`` and ``session`` stay usable inside the
+    coroutine even though it runs on the loop thread.
+
+    Args:
+        coro: Coroutine to run
+        timeout: Seconds to wait for the result, or None to wait indefinitely
+
+    Returns:
+        The coroutine's result
+
+    Raises:
+        Exception: Whatever the coroutine raised
+        concurrent.futures.TimeoutError: If the result is not ready within
+            ``timeout``, in which case the coroutine is cancelled
+    """
+    future = _submit(coro)
+    try:
+        return future.result(timeout)
+    # Not the builtin TimeoutError before Python 3.11
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
+
+
+async def run_coroutine_async(coro: Coroutine[Any, Any, T]) -> T:
+    """Await a coroutine on the background loop from any other event loop.
+
+    Async views run on a short-lived loop per request; handing work that uses
+    loop-bound resources (such as pooled HTTP connections) to the background
+    loop lets those resources outlive the request.
+
+    Args:
+        coro: Coroutine to run
+
+    Returns:
+        The coroutine's result
+    """
+    if in_background_loop():
+        return await coro
+    return await asyncio.wrap_future(_submit(coro))
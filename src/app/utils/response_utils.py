@@ -2,18 +2,25 @@
 
 from __future__ import annotations
 
-from typing import Any
+import hashlib
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any
 
-from flask import jsonify
+from flask import Response, jsonify, make_response, request
+from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
 
 from src.app.models.api_endpoint import APIEndpoint
 from src.app.models.api_models import APIResponse, APIResponseBuilder
+from src.app.models.db import db
 from src.app.models.reference_models import (
     AllowedDirectory,
     PersistentVariable,
 )
 
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
 
 def create_api_response(response: APIResponse) -> tuple[Any, int]:
     """Create a Flask response from an APIResponse object.
@@ -44,41 +51,115 @@ def handle_db_error(e: SQLAlchemyError, operation: str) -> tuple[Any, int]:
     return create_api_response(response)
 
 
+def table_etag(model: Any, *criteria: Any) -> str:
+    """Compute an ETag for a model's rows from their count and latest change.
+
+    The model's ``updated_at`` must be set with sub-second precision on every
+    update (e.g. ``onupdate=datetime.utcnow``); a one-second database clock
+    would let two edits within a second share an ETag.
+
+    Args:
+        model: Model class with ``id`` and ``updated_at`` columns
+        *criteria: Optional WHERE clauses restricting the rows considered
+
+    Returns:
+        Short hex digest that changes whenever a row is added, removed or updated
+    """
+    count, max_id, latest = db.session.execute(
+        select(func.count(), func.max(model.id), func.max(model.updated_at))
+        .select_from(model)
+        .where(*criteria)
+    ).one()
+    fingerprint = f"{count}:{max_id}:{latest.isoformat() if latest else ''}"
+    return hashlib.blake2b(fingerprint.encode(), digest_size=8).hexdigest()
+
+
+def not_modified_response(etag: str) -> Response | None:
+    """Build a 304 response if the client already holds this ETag.
+
+    Args:
+        etag: Current ETag of the requested resource
+
+    Returns:
+        A 304 response carrying the ETag header, or None if the client copy
+        is stale
+    """
+    if not request.if_none_match.contains(etag):
+        return None
+    response = Response(status=HTTPStatus.NOT_MODIFIED)
+    response.set_etag(etag)
+    return response
+
+
+def etag_response(etag: str, build_response: Callable[[], Any]) -> Response:
+    """Answer 304 when the client's ETag matches, else build the response.
+
+    Args:
+        etag: Current ETag of the requested resource
+        build_response: Callable returning any Flask view return value; only
+            invoked when the client copy is stale
+
+    Returns:
+        Flask response carrying the ETag header
+    """
+    response = not_modified_response(etag)
+    if response is None:
+        response = make_response(build_response())
+        response.set_etag(etag)
+    return response
+
+
+# Fields each serializer emits; list routes select just these columns
+VARIABLE_FIELDS = ("id", "name", "value", "description", "created_at", "updated_at")
+DIRECTORY_FIELDS = (
+    "id",
+    "path",
+    "description",
+    "is_recursive",
+    "created_at",
+    "updated_at",
+)
+ENDPOINT_FIELDS = (
+    "id",
+    "name",
+    "type",
+    "base_url",
+    "auth_type",
+    "headers",
+    "rate_limit",
+    "description",
+    "created_at",
+    "updated_at",
+)
+
+
 def serialize_variable(variable: PersistentVariable) -> dict[str, Any]:
     """Serialize a PersistentVariable instance."""
-    return {
-        "id": variable.id,
-        "name": variable.name,
-        "value": variable.value,
-        "description": variable.description,
-        "created_at": variable.created_at,
-        "updated_at": variable.updated_at,
-    }
+    return {field: getattr(variable, field) for field in VARIABLE_FIELDS}
 
 
 def serialize_directory(directory: AllowedDirectory) -> dict[str, Any]:
     """Serialize an AllowedDirectory instance."""
-    return {
-        "id": directory.id,
-        "path": directory.path,
-        "description": directory.description,
-        "is_recursive": directory.is_recursive,
-        "created_at": directory.created_at,
-        "updated_at": directory.updated_at,
-    }
+    return {field: getattr(directory, field) for field in DIRECTORY_FIELDS}
 
 
 def serialize_endpoint(endpoint: APIEndpoint) -> dict[str, Any]:
     """Serialize an APIEndpoint instance."""
-    return {
-        "id": endpoint.id,
-        "name": endpoint.name,
-        "type": endpoint.type,
-        "base_url": endpoint.base_url,
-        "auth_type": endpoint.auth_type,
-        "headers": endpoint.headers,
-        "rate_limit": endpoint.rate_limit,
-        "description": endpoint.description,
-        "created_at": endpoint.created_at,
-        "updated_at": endpoint.updated_at,
-    }
+    return {field: getattr(endpoint, field) for field in ENDPOINT_FIELDS}
+
+
+def serialize_all(model: Any, fields: tuple[str, ...]) -> list[dict[str, Any]]:
+    """Serialize every row of a model straight from its columns.
+
+    Selects only the given columns and builds dicts from the result rows,
+    skipping ORM instance construction and the identity map.
+
+    Args:
+        model: Model class to read
+        fields: Column names to include, as in the matching serializer
+
+    Returns:
+        One dict per row, shaped like the model's serializer output
+    """
+    stmt = select(*(getattr(model, field) for field in fields))
+    return [dict(row) for row in db.session.execute(stmt).mappings()]
@@ -0,0 +1,24 @@
+"""Shared tiktoken encoding for local token counts."""
+
+from __future__ import annotations
+
+from functools import lru_cache
+
+import tiktoken
+
+# Encoding used for every local token count
+ENCODING_NAME = "cl100k_base"
+
+
+@lru_cache(maxsize=1)
+def get_encoding() -> tiktoken.Encoding:
+    """Get the process-wide encoding, loading it on first use.
+
+    Loading is deferred because it may download the BPE ranks; a failed load
+    is not cached, so the next call tries again. Encodings are immutable and
+    safe to share between threads.
+
+    Returns:
+        The cl100k_base encoding
+    """
+    return tiktoken.get_encoding(ENCODING_NAME)
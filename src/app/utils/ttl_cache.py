@@ -0,0 +1,69 @@
+"""Small in-process cache whose entries expire after a fixed TTL."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import event
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable
+
+
+class TTLCache:
+    """Per-process mapping for rarely changing rows.
+
+    Values should be plain data or detached ORM instances, never objects still
+    attached to a request's session. Callers invalidate on writes they can see
+    (usually via mapper events); the TTL bounds staleness for the rest.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int | None = None) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: dict[Hashable, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            self._entries.pop(key, None)
+            return default
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Cache value under key for the configured TTL.
+
+        When max_entries is reached, expired entries are dropped first and
+        then the oldest ones.
+        """
+        now = time.monotonic()
+        entries = self._entries
+        with self._lock:
+            entries.pop(key, None)
+            if self.max_entries is not None and len(entries) >= self.max_entries:
+                for stale in [k for k, (exp, _) in entries.items() if now >= exp]:
+                    entries.pop(stale, None)
+                while len(entries) >= self.max_entries:
+                    entries.pop(next(iter(entries)), None)
+            entries[key] = (now + self.ttl_seconds, value)
+
+    def invalidate(self, *_args: Any) -> None:
+        """Drop every entry; usable directly as a mapper event listener."""
+        self._entries.clear()
+
+    def invalidate_on(self, *models: type) -> None:
+        """Drop every entry whenever a row of one of the models is written.
+
+        Covers ORM inserts, updates and deletes made by this process; the TTL
+        bounds staleness for writes made elsewhere.
+        """
+        for model in models:
+            for event_name in ("after_insert", "after_update", "after_delete"):
+                event.listen(model, event_name, self.invalidate)
@@ -72,7 +72,12 @@ class FileReferenceValidator(BaseValidator):
             raise ValidationError(f"File path does not exist: {path}")
 
         # Check if path is within allowed directories
-        allowed_dirs = [Path(d.path) for d in AllowedDirectory.query.all()]
+        allowed_dirs = [
+            Path(allowed_path)
+            for (allowed_path,) in AllowedDirectory.query.with_entities(
+                AllowedDirectory.path
+            )
+        ]
         if not any(
             str(path_obj).startswith(str(allowed_dir)) for allowed_dir in allowed_dirs
         ):